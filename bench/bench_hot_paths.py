@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+bench_hot_paths.py
+Time the client hot paths on synthetic market data and keep JSON baselines.
+
+    python3 bench/bench_hot_paths.py                       # run, save bench/results/<commit>.json
+    python3 bench/bench_hot_paths.py --compare bench/results/<other>.json
+    python3 bench/bench_hot_paths.py --underlyings 6 --strikes 11 --depth 10
+
+`--compare` exits with status 1 when a benchmark's best run (min, the least
+noisy statistic) got slower than `--threshold` percent, so it can gate a
+commit. Every run also reports the cost of the metrics instrumentation on
+the market data path against its 1% budget.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), os.path.join(ROOT, "logs"), os.path.dirname(os.path.abspath(__file__))]
+
+from api import GameAPI, AddOrderRequest
+from metrics import Metrics
+from test_bot import TradingBot
+from log_converter import flatten
+from market_gen import SyntheticMarket, DEFAULT_UNDERLYINGS
+
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+METRICS_BUDGET_PCT = 1.0
+
+
+def timeit(fn: Callable[[Any], Any], inputs: List[Any], repeat: int, min_time: float = 0.1) -> Dict[str, float]:
+    """Run `fn` over every input `repeat` times, stats are per call in ns.
+
+    Each repeat loops over the inputs until it lasts at least `min_time`
+    seconds so fast paths are not dominated by timer noise.
+    """
+    start = time.perf_counter_ns()
+    for item in inputs:
+        fn(item)
+    passes = max(1, int(min_time * 1e9 / max(1, time.perf_counter_ns() - start)))
+
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(passes):
+            for item in inputs:
+                fn(item)
+        per_call.append((time.perf_counter_ns() - start) / (len(inputs) * passes))
+    per_call.sort()
+    return {
+        "median_ns": statistics.median(per_call),
+        "min_ns": per_call[0],
+        "max_ns": per_call[-1],
+        "calls": len(inputs) * passes * repeat,
+    }
+
+
+def timeit_pair(fn_a: Callable[[Any], Any], fn_b: Callable[[Any], Any], inputs: List[Any],
+                repeat: int) -> List[Dict[str, float]]:
+    """Like `timeit` for two variants of a path, alternating one pass of each.
+
+    Back to back runs drift by more than a few percent on a busy machine,
+    interleaving is what makes a 1% difference measurable.
+    """
+    per_call = [[], []]
+    for _ in range(repeat):
+        for fn, times in ((fn_a, per_call[0]), (fn_b, per_call[1])):
+            start = time.perf_counter_ns()
+            for item in inputs:
+                fn(item)
+            times.append((time.perf_counter_ns() - start) / len(inputs))
+    stats = []
+    for times in per_call:
+        times.sort()
+        stats.append({
+            "median_ns": statistics.median(times),
+            "min_ns": times[0],
+            "max_ns": times[-1],
+            "calls": len(inputs) * repeat,
+        })
+    return stats
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> Dict[str, Any]:
+    market = SyntheticMarket(
+        underlyings=DEFAULT_UNDERLYINGS[:args.underlyings],
+        expiries=args.expiries,
+        strikes_per_expiry=args.strikes,
+        depth=args.depth,
+        events_per_update=args.events,
+        seed=args.seed,
+    )
+    frames = market.frames(args.updates, rate_hz=args.rate)
+    updates = [json.loads(frame) for frame in frames]
+
+    api = GameAPI("ws://bench", "bench")
+    parsed = [api._parse_market_data(update) for update in updates]
+    results = {}
+
+    results["decode"] = timeit(json.loads, frames, args.repeat)
+    # Same path with the metrics disabled, paired pass by pass so machine noise hits both alike
+    api_off = GameAPI("ws://bench", "bench", metrics=Metrics(enabled=False))
+    results["process_market_data_update"], results["market_data_metrics_off"] = timeit_pair(
+        api._process_market_data_update, api_off._process_market_data_update, updates, args.repeat * 5)
+    results["cache_market_data"] = timeit(api._cache_market_data, parsed, args.repeat)
+
+    bot = TradingBot(api)
+    books = []
+    for instrument_id, book in updates[-1]["orderbook_depths"].items():
+        if book["bids"] and book["asks"]:
+            books.append(api.current_orderbooks[instrument_id])
+
+    def fair_mid(orderbook):
+        bot.orderbook = orderbook
+        bot.compute_fair_mid_price()
+    results["compute_fair_mid_price"] = timeit(fair_mid, books, args.repeat)
+
+    orders = [
+        AddOrderRequest(user_request_id=str(i).zfill(10), instrument_id=instrument_id,
+                        price=1000, expiry=310000, side="bid", quantity=1)
+        for i, instrument_id in enumerate(market.instrument_ids)
+    ]
+    results["send_encode"] = timeit(api._encode, orders, args.repeat)
+
+    snapshots = [(update["time"], instrument_id, book)
+                 for update in updates for instrument_id, book in update["orderbook_depths"].items()]
+    results["flatten"] = timeit(lambda snap: flatten(*snap, 5), snapshots[:20000], args.repeat)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "created": int(time.time()),
+            "instruments": len(market.instruments),
+            "params": {k: v for k, v in vars(args).items() if k not in ("compare", "save")},
+        },
+        "results": results,
+    }
+
+
+def metrics_overhead(results: Dict[str, Any]) -> float:
+    """Percent added by the metrics on the market data path, medians of the paired runs"""
+    on = results["process_market_data_update"]["median_ns"]
+    off = results["market_data_metrics_off"]["median_ns"]
+    return (on / off - 1) * 100
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> bool:
+    """Print a comparison table, returns True when something regressed"""
+    regressed = False
+    print(f"{'benchmark':<30}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<30}{'-':>14}{result['min_ns']:>12.0f}ns{'new':>10}")
+            continue
+        change = (result["min_ns"] / base["min_ns"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            flag, regressed = "  SLOWER", True
+        print(f"{name:<30}{base['min_ns']:>12.0f}ns{result['min_ns']:>12.0f}ns{change:>+9.1f}%{flag}")
+    if baseline["meta"].get("params") != current["meta"].get("params"):
+        print("warning: baseline was recorded with different parameters")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--underlyings", type=int, default=6)
+    parser.add_argument("--expiries", type=int, nargs="+", default=[300, 600])
+    parser.add_argument("--strikes", type=int, default=5, help="strikes per expiry (calls and puts each)")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--events", type=float, default=2.0, help="market events per update")
+    parser.add_argument("--rate", type=float, default=10, help="updates per second of exchange time")
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="output JSON (default bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    # The hot paths log at INFO; measure them, not the log handlers
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run(args)
+    path = args.save or os.path.join(RESULTS_DIR, f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"✓ {report['meta']['instruments']} instruments, results → {path}")
+
+    overhead = metrics_overhead(report["results"])
+    flag = "  OVER BUDGET" if overhead > METRICS_BUDGET_PCT else ""
+    print(f"metrics overhead on the market data path: {overhead:+.2f}% (budget {METRICS_BUDGET_PCT:.0f}%){flag}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh)
+        sys.exit(1 if compare(report, baseline, args.threshold) else 0)
+
+    print(f"{'benchmark':<30}{'min':>14}{'median':>14}")
+    for name, result in report["results"].items():
+        print(f"{name:<30}{result['min_ns']:>12.0f}ns{result['median_ns']:>12.0f}ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+import_budget.py
+Check that the trading process starts light: import time of the core modules
+(best of N cold interpreters, `python -X importtime`) and no analytics
+library (numpy, pandas, pyarrow) loaded by the order path.
+
+    python3 bench/import_budget.py
+    python3 bench/import_budget.py --repeat 10 --scale 2   # slower machine
+
+Exits with status 1 when a budget is exceeded, so it can gate a commit.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+# Cumulative import time budgets in ms
+BUDGETS_MS: Dict[str, float] = {
+    "api": 250,
+    "test_bot": 260,
+    "main": 280,
+}
+
+HEAVY_MODULES = ("numpy", "pandas", "pyarrow")
+
+# Code that must run without touching HEAVY_MODULES
+LIGHT_PATHS: Dict[str, str] = {
+    "import main": "import main",
+    "GameAPI(bars=False)": "from api import GameAPI; GameAPI('ws://localhost:9001/trade', 'secret', bars=False)",
+}
+
+
+def _run(code: str, importtime: bool = False) -> Tuple[str, str]:
+    args = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    env = dict(os.environ, PYTHONPATH=SRC)
+    proc = subprocess.run(args, capture_output=True, text=True, cwd=SRC, env=env, check=True)
+    return proc.stdout, proc.stderr
+
+
+def import_time_ms(module: str, repeat: int) -> float:
+    """Best cumulative import time of `module` over `repeat` fresh interpreters"""
+    best = float("inf")
+    for _ in range(repeat):
+        _, stderr = _run(f"import {module}", importtime=True)
+        for line in stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module and not parts[2].startswith("  "):
+                best = min(best, int(parts[1]) / 1000)
+    return best
+
+
+def heavy_modules_loaded(code: str) -> List[str]:
+    stdout, _ = _run(f"{code}\nimport sys\nprint(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    return stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    args = parser.parse_args()
+
+    _run("import main")  # compile the .pyc files so the first timing isn't an outlier
+
+    failed = False
+    for module, budget in BUDGETS_MS.items():
+        budget *= args.scale
+        took = import_time_ms(module, args.repeat)
+        over = took > budget
+        failed |= over
+        print(f"{'FAIL' if over else 'ok':<5}{module:<14}{took:8.1f}ms  (budget {budget:.0f}ms)")
+
+    for name, code in LIGHT_PATHS.items():
+        heavy = heavy_modules_loaded(code)
+        failed |= bool(heavy)
+        print(f"{'FAIL' if heavy else 'ok':<5}{name:<22}{'loads ' + ', '.join(heavy) if heavy else 'no analytics imports'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
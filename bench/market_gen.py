@@ -0,0 +1,112 @@
+"""
+market_gen.py
+Synthetic `market_data_update` payloads shaped like the exchange's.
+
+Every underlying follows a seeded random walk; futures and options are
+quoted around it with `depth` price levels per side. Instrument ids use the
+exchange naming: `$JUMP_future_300`, `$JUMP_call_10000_300`, ...
+"""
+
+import json
+import math
+import random
+from typing import Optional, List, Dict, Any, Iterator
+
+DEFAULT_UNDERLYINGS = ["$JUMP", "$GARR", "$CARD", "$HEST", "$LOGN", "$SIMP"]
+
+
+class SyntheticMarket:
+
+    def __init__(self,
+                 underlyings: Optional[List[str]] = None,
+                 expiries: Optional[List[int]] = None,
+                 strikes_per_expiry: int = 5,
+                 depth: int = 5,
+                 events_per_update: float = 2.0,
+                 start_price: int = 10000,
+                 tick: int = 1,
+                 seed: int = 42):
+        self.underlyings = underlyings or list(DEFAULT_UNDERLYINGS)
+        self.expiries = expiries if expiries is not None else [300, 600]
+        self.strikes_per_expiry = strikes_per_expiry
+        self.depth = depth
+        self.events_per_update = events_per_update
+        self.tick = tick
+        self.rng = random.Random(seed)
+        self.time = 0
+        self.prices = {u: float(start_price) for u in self.underlyings}
+
+        # instrument_id -> (underlying, type, strike, expiry)
+        self.instruments: Dict[str, tuple] = {}
+        for u in self.underlyings:
+            self.instruments[u] = (u, "spot", None, None)
+            for expiry in self.expiries:
+                self.instruments[f"{u}_future_{expiry}"] = (u, "future", None, expiry)
+                half = strikes_per_expiry // 2
+                for k in range(-half, strikes_per_expiry - half):
+                    strike = start_price + k * start_price // 20
+                    self.instruments[f"{u}_call_{strike}_{expiry}"] = (u, "call", strike, expiry)
+                    self.instruments[f"{u}_put_{strike}_{expiry}"] = (u, "put", strike, expiry)
+
+    @property
+    def instrument_ids(self) -> List[str]:
+        return list(self.instruments)
+
+    def _fair(self, instrument_id: str) -> float:
+        underlying, kind, strike, expiry = self.instruments[instrument_id]
+        spot = self.prices[underlying]
+        if kind in ("spot", "future"):
+            return spot
+        # Intrinsic value plus a crude time value so options stay two-sided
+        time_value = 0.02 * spot * math.sqrt(expiry / 600)
+        intrinsic = max(0.0, spot - strike) if kind == "call" else max(0.0, strike - spot)
+        return intrinsic + time_value
+
+    def _book(self, fair: float) -> Dict[str, Dict[str, int]]:
+        rng = self.rng
+        best_bid = max(self.tick, int(fair) - rng.randint(1, 3) * self.tick)
+        best_ask = int(fair) + rng.randint(1, 3) * self.tick
+        bids, asks = {}, {}
+        for level in range(self.depth):
+            if best_bid - level * self.tick > 0:
+                bids[str(best_bid - level * self.tick)] = rng.randint(1, 50)
+            asks[str(best_ask + level * self.tick)] = rng.randint(1, 50)
+        return {"bids": bids, "asks": asks}
+
+    def _events(self) -> List[Dict[str, Any]]:
+        rng = self.rng
+        n = int(self.events_per_update) + (rng.random() < self.events_per_update % 1)
+        events = []
+        for _ in range(n):
+            instrument_id = rng.choice(self.instrument_ids)
+            events.append({
+                "type": "trade",
+                "instrument_id": instrument_id,
+                "price": int(self._fair(instrument_id)),
+                "quantity": rng.randint(1, 10),
+                "time": self.time,
+            })
+        return events
+
+    def update(self, dt_ms: int = 100) -> Dict[str, Any]:
+        """Advance the market by `dt_ms` and return one decoded update payload"""
+        self.time += dt_ms
+        for u in self.underlyings:
+            self.prices[u] = max(10.0, self.prices[u] * (1 + self.rng.gauss(0, 0.001)))
+
+        return {
+            "type": "market_data_update",
+            "time": self.time,
+            "candles": {"tradeable": {}, "untradeable": {}},
+            "orderbook_depths": {i: self._book(self._fair(i)) for i in self.instruments},
+            "events": self._events(),
+        }
+
+    def stream(self, n: int, rate_hz: float = 10) -> Iterator[Dict[str, Any]]:
+        dt_ms = max(1, int(1000 / rate_hz))
+        for _ in range(n):
+            yield self.update(dt_ms)
+
+    def frames(self, n: int, rate_hz: float = 10) -> List[str]:
+        """Raw JSON frames as they come off the websocket"""
+        return [json.dumps(update) for update in self.stream(n, rate_hz)]
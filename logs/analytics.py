@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+analytics.py
+Post-session report from recorded books and order logs, streamed with
+pyarrow (row group by row group, one worker process per core).
+
+    python3 analytics.py market_book_5lvl.parquet
+    python3 analytics.py books/ --orders orders.jsonl --workers 8 --json
+
+Books: N-level Parquet as written by log_converter.py (a file or a
+directory of files). Their `time` is the raw exchange clock, game seconds:
+`--time-scale` (ms per unit, default 1000) converts it to ms.
+
+Orders: JSONL or Parquet, one row per order event (src/journal.py writes it):
+    time         local time (ms) the event was seen
+    market_time  exchange time (ms) of the last market data, GameAPI.last_market_time
+    event        "sent" | "ack" | "reject" | "fill" | "cancel"
+    rid          user_request_id
+    order_id, instrument_id, side ("bid"/"ask"), price, quantity
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, List, Dict, Tuple, Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+BATCH_ROWS = 256_000
+
+# Columns read from the order log, anything else (journal snapshots...) is ignored
+ORDER_LOG_SCHEMA = pa.schema([
+    ("time", pa.int64()),
+    ("market_time", pa.int64()),
+    ("event", pa.string()),
+    ("rid", pa.string()),
+    ("order_id", pa.string()),
+    ("instrument_id", pa.string()),
+    ("side", pa.string()),
+    ("price", pa.float64()),
+    ("quantity", pa.int64()),
+])
+
+
+# ── books ─────────────────────────────────────────────────────────────────────
+
+def _side_depth(batch: pa.RecordBatch, side: str, depth: int) -> pa.Array:
+    total = pc.fill_null(batch.column(f"{side}_quantity1"), 0)
+    for level in range(2, depth + 1):
+        total = pc.add(total, pc.fill_null(batch.column(f"{side}_quantity{level}"), 0))
+    return total
+
+
+def _scan_row_group(path: str, row_group: int, depth: int, time_scale: int,
+                    fill_targets: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    """Partial aggregates for one row group, merged by the parent"""
+    columns = ["time", "asset", "bid_price1", "ask_price1"]
+    columns += [f"{side}_quantity{level}" for side in ("bid", "ask") for level in range(1, depth + 1)]
+
+    sums = defaultdict(lambda: np.zeros(5))  # rows, two-sided rows, spread sum, bid depth sum, ask depth sum
+    spreads: Dict[Tuple[str, int], int] = defaultdict(int)
+    # Latest book (time, mid) at or before each fill, per asset
+    best = {asset: (np.full(len(times), -np.inf), np.full(len(times), np.nan))
+            for asset, times in fill_targets.items()}
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_ROWS, row_groups=[row_group], columns=columns):
+        spread = pc.subtract(batch.column("ask_price1"), batch.column("bid_price1"))
+        table = pa.table({
+            "asset": batch.column("asset"),
+            "spread": spread,
+            "two_sided": pc.cast(pc.is_valid(spread), pa.int64()),
+            "bid_depth": _side_depth(batch, "bid", depth),
+            "ask_depth": _side_depth(batch, "ask", depth),
+        })
+        grouped = table.group_by("asset").aggregate([
+            ("asset", "count"), ("two_sided", "sum"), ("spread", "sum"), ("bid_depth", "sum"), ("ask_depth", "sum"),
+        ]).to_pydict()
+        for i, asset in enumerate(grouped["asset"]):
+            sums[asset] += (grouped["asset_count"][i], grouped["two_sided_sum"][i], grouped["spread_sum"][i] or 0,
+                            grouped["bid_depth_sum"][i], grouped["ask_depth_sum"][i])
+
+        dist = table.filter(pc.is_valid(spread)).group_by(["asset", "spread"]).aggregate([("asset", "count")]).to_pydict()
+        for asset, value, count in zip(dist["asset"], dist["spread"], dist["asset_count"]):
+            spreads[(asset, value)] += count
+
+        if fill_targets:
+            _match_fills(batch, spread, time_scale, fill_targets, best)
+
+    return {"sums": dict(sums), "spreads": dict(spreads), "best": best}
+
+
+def _match_fills(batch: pa.RecordBatch, spread: pa.Array, time_scale: int, fill_targets: Dict[str, np.ndarray],
+                 best: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+    encoded = pc.dictionary_encode(batch.column("asset"))
+    codes = encoded.indices.to_numpy(zero_copy_only=False)
+    times = batch.column("time").to_numpy(zero_copy_only=False) * time_scale
+    two_sided = pc.is_valid(spread).to_numpy(zero_copy_only=False)
+    mid = pc.divide(pc.add(batch.column("ask_price1"), batch.column("bid_price1")).cast(pa.float64()), 2.0)
+    mid = mid.to_numpy(zero_copy_only=False)
+
+    for code, asset in enumerate(encoded.dictionary.to_pylist()):
+        targets = fill_targets.get(asset)
+        if targets is None:
+            continue
+        rows = np.flatnonzero((codes == code) & two_sided)
+        if not len(rows):
+            continue
+        rows = rows[np.argsort(times[rows], kind="stable")]
+        pos = np.searchsorted(times[rows], targets, side="right") - 1
+        found = pos >= 0
+        cand_time = np.where(found, times[rows[np.maximum(pos, 0)]], -np.inf)
+        cand_mid = mid[rows[np.maximum(pos, 0)]]
+        best_time, best_mid = best[asset]
+        newer = found & (cand_time >= best_time)
+        best_time[newer] = cand_time[newer]
+        best_mid[newer] = cand_mid[newer]
+
+
+def _quantile(counts: Dict[int, int], q: float) -> Optional[int]:
+    total = sum(counts.values())
+    if not total:
+        return None
+    rank, seen = q * (total - 1), 0
+    for value in sorted(counts):
+        seen += counts[value]
+        if seen > rank:
+            return value
+    return max(counts)
+
+
+def scan_books(path: str, depth: int, workers: int, fill_targets: Dict[str, np.ndarray], time_scale: int = 1000
+               ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+    """Per-asset book stats, and for each fill target the (time in ms, mid) of
+    the latest two-sided book at or before it (-inf, NaN when there is none)"""
+    files = ds.dataset(path, format="parquet").files
+    tasks = [(f, rg) for f in files for rg in range(pq.ParquetFile(f).num_row_groups)]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)) or 1) as pool:
+        partials = list(pool.map(_scan_row_group, *zip(*tasks), [depth] * len(tasks), [time_scale] * len(tasks),
+                                 [fill_targets] * len(tasks)))
+
+    sums: Dict[str, np.ndarray] = defaultdict(lambda: np.zeros(5))
+    spreads: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    best = {asset: (np.full(len(t), -np.inf), np.full(len(t), np.nan)) for asset, t in fill_targets.items()}
+    for part in partials:
+        for asset, values in part["sums"].items():
+            sums[asset] += values
+        for (asset, value), count in part["spreads"].items():
+            spreads[asset][value] += count
+        for asset, (times, mids) in part["best"].items():
+            newer = times >= best[asset][0]
+            best[asset][0][newer] = times[newer]
+            best[asset][1][newer] = mids[newer]
+
+    stats = {}
+    for asset, (rows, two_sided, spread_sum, bid_depth, ask_depth) in sorted(sums.items()):
+        stats[asset] = {
+            "snapshots": int(rows),
+            "two_sided_pct": 100 * two_sided / rows if rows else 0,
+            "spread_mean": spread_sum / two_sided if two_sided else None,
+            "spread_p50": _quantile(spreads[asset], 0.5),
+            "spread_p95": _quantile(spreads[asset], 0.95),
+            "bid_depth_mean": bid_depth / rows if rows else 0,
+            "ask_depth_mean": ask_depth / rows if rows else 0,
+        }
+    return stats, best
+
+
+# ── orders ────────────────────────────────────────────────────────────────────
+
+def read_orders(path: str) -> pa.Table:
+    if path.endswith((".jsonl", ".json")):
+        import pyarrow.json as pj
+        options = pj.ParseOptions(explicit_schema=ORDER_LOG_SCHEMA, unexpected_field_behavior="ignore")
+        return pj.read_json(path, parse_options=options)
+    return ds.dataset(path, format="parquet").to_table(columns=ORDER_LOG_SCHEMA.names)
+
+
+def fill_targets_of(orders: pa.Table) -> Tuple[pa.Table, Dict[str, np.ndarray]]:
+    """Fills with an exchange timestamp, and their times grouped per asset"""
+    fills = orders.filter(pc.and_(pc.equal(orders["event"], "fill"), pc.is_valid(orders["market_time"])))
+    fills = fills.sort_by([("instrument_id", "ascending"), ("market_time", "ascending")])
+    targets = {}
+    assets = fills["instrument_id"].to_numpy(zero_copy_only=False)
+    times = fills["market_time"].to_numpy(zero_copy_only=False)
+    for asset in np.unique(assets):
+        targets[asset] = times[assets == asset]
+    return fills, targets
+
+
+def order_stats(orders: pa.Table, fills: pa.Table, fair: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                targets: Dict[str, np.ndarray], max_gap_ms: int) -> Dict[str, Any]:
+    sent = orders.filter(pc.equal(orders["event"], "sent")).select(["rid", "time", "instrument_id", "quantity"])
+    acks = orders.filter(pc.is_in(orders["event"], pa.array(["ack", "reject"]))).select(["rid", "time"])
+    acks = acks.rename_columns(["rid", "ack_time"])
+    joined = sent.join(acks, "rid", join_type="inner")
+    latency = pc.subtract(joined["ack_time"], joined["time"])
+
+    out: Dict[str, Any] = {"orders_sent": sent.num_rows, "orders_acked": joined.num_rows}
+    if len(latency):
+        quantiles = pc.quantile(latency, q=[0.5, 0.9, 0.99]).to_pylist()
+        out["latency_ms"] = {"p50": quantiles[0], "p90": quantiles[1], "p99": quantiles[2],
+                             "max": pc.max(latency).as_py(), "mean": pc.mean(latency).as_py()}
+
+    per_asset = defaultdict(lambda: {"sent_qty": 0, "filled_qty": 0, "slippage_sum": 0.0, "slippage_n": 0})
+    for row in sent.group_by("instrument_id").aggregate([("quantity", "sum")]).to_pylist():
+        per_asset[row["instrument_id"]]["sent_qty"] = row["quantity_sum"]
+    all_fills = orders.filter(pc.equal(orders["event"], "fill"))
+    for row in all_fills.group_by("instrument_id").aggregate([("quantity", "sum")]).to_pylist():
+        per_asset[row["instrument_id"]]["filled_qty"] = row["quantity_sum"]
+
+    # Slippage in price ticks: positive means we traded worse than the mid.
+    # Fills without a book snapshot in the `max_gap_ms` before them (outside the
+    # recorded session, or a clock mismatch) are counted, not priced
+    assets = fills["instrument_id"].to_numpy(zero_copy_only=False)
+    prices = fills["price"].to_numpy(zero_copy_only=False).astype(float)
+    signs = np.where(fills["side"].to_numpy(zero_copy_only=False) == "bid", 1.0, -1.0)
+    out["fills_matched"] = out["fills_unmatched"] = 0
+    for asset, (book_times, mids) in fair.items():
+        rows = assets == asset
+        matched = targets[asset] - book_times <= max_gap_ms
+        out["fills_matched"] += int(matched.sum())
+        out["fills_unmatched"] += int((~matched).sum())
+        slip = signs[rows] * (prices[rows] - mids)
+        slip = slip[matched & np.isfinite(slip)]
+        per_asset[asset]["slippage_sum"] += float(slip.sum())
+        per_asset[asset]["slippage_n"] += len(slip)
+
+    assets_out = {}
+    for asset, acc in sorted(per_asset.items()):
+        assets_out[asset] = {
+            "fill_rate_pct": 100 * acc["filled_qty"] / acc["sent_qty"] if acc["sent_qty"] else None,
+            "filled_qty": acc["filled_qty"],
+            "slippage_mean": acc["slippage_sum"] / acc["slippage_n"] if acc["slippage_n"] else None,
+        }
+    out["assets"] = assets_out
+    return out
+
+
+# ── report ────────────────────────────────────────────────────────────────────
+
+def _fmt(value, spec=".1f"):
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(books: Dict[str, Dict[str, Any]], orders: Optional[Dict[str, Any]]):
+    print(f"{'asset':<28}{'snaps':>8}{'2-sided%':>10}{'spread':>9}{'p50':>6}{'p95':>6}{'bid depth':>11}{'ask depth':>11}")
+    for asset, s in books.items():
+        print(f"{asset:<28}{s['snapshots']:>8}{s['two_sided_pct']:>10.1f}{_fmt(s['spread_mean']):>9}"
+              f"{_fmt(s['spread_p50'], 'd'):>6}{_fmt(s['spread_p95'], 'd'):>6}"
+              f"{s['bid_depth_mean']:>11.1f}{s['ask_depth_mean']:>11.1f}")
+    if not orders:
+        return
+
+    print(f"\norders sent {orders['orders_sent']}, acked {orders['orders_acked']}, "
+          f"fills matched to a book {orders['fills_matched']}, unmatched {orders['fills_unmatched']}")
+    if "latency_ms" in orders:
+        lat = orders["latency_ms"]
+        print(f"ack latency ms  p50 {lat['p50']:.1f}  p90 {lat['p90']:.1f}  p99 {lat['p99']:.1f}  max {lat['max']}")
+    print(f"\n{'asset':<28}{'fill%':>8}{'filled':>8}{'slippage':>10}")
+    for asset, s in orders["assets"].items():
+        print(f"{asset:<28}{_fmt(s['fill_rate_pct']):>8}{s['filled_qty']:>8}{_fmt(s['slippage_mean'], '.2f'):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("books", help="book Parquet file or directory")
+    parser.add_argument("--orders", help="order log (JSONL or Parquet)")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--time-scale", type=int, default=1000,
+                        help="ms per unit of the books' time column (1000: game seconds, 1: already ms)")
+    parser.add_argument("--max-gap-ms", type=int, default=5000,
+                        help="oldest book snapshot a fill can be priced against")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    orders = fills = None
+    targets: Dict[str, np.ndarray] = {}
+    if args.orders:
+        orders = read_orders(args.orders)
+        fills, targets = fill_targets_of(orders)
+
+    books, fair = scan_books(args.books, args.depth, args.workers, targets, args.time_scale)
+    order_report = None
+    if orders is not None:
+        order_report = order_stats(orders, fills, fair, targets, args.max_gap_ms)
+        if order_report["fills_unmatched"]:
+            print(f"warning: {order_report['fills_unmatched']} fills have no book snapshot within "
+                  f"{args.max_gap_ms}ms before them and were left out of slippage (check --time-scale)",
+                  file=sys.stderr)
+
+    if args.json:
+        json.dump({"books": books, "orders": order_report}, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(books, order_report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
 import asyncio
 import json
+import math
 import websockets
-import pandas as pd
 from dataclasses import dataclass, asdict, field
-from typing import Optional, List, Dict, Tuple, Any
+from typing import Optional, List, Dict, Tuple, Any, TYPE_CHECKING
 from datetime import datetime
-from collections import defaultdict
+from collections import deque
 import logging
+import time
+
+from instruments import InstrumentRegistry, InstrumentTable, KIND_FUTURE, KIND_CALL, KIND_PUT
+from journal import Journal, JournalState
+from metrics import Metrics
+from reconnect import ReconnectManager, BackoffPolicy
+from timing_wheel import OrderExpiryTracker, TrackedOrder
+
+# numpy / pandas cost ~0.5s at import, only analytics pull them in (see bench/import_budget.py)
+if TYPE_CHECKING:
+    import pandas as pd
+    from bars import BarBuilder
 
 # Type definitions
 InstrumentID_t = str
@@ -136,91 +148,401 @@ class InstrumentInfo:
     bid_volume: Quantity_t = 0
     ask_volume: Quantity_t = 0
 
+# Order connections drop market data frames before decoding them when the
+# type tag shows up this early in the frame
+_MARKET_DATA_TAG = '"market_data_update"'
+_MARKET_DATA_TAG_WINDOW = 64
+
+
+class Connection:
+    """One websocket to the exchange and the requests in flight on it"""
+
+    def __init__(self, name: str, carries_market_data: bool = True, carries_orders: bool = True):
+        self.name = name
+        self.carries_market_data = carries_market_data
+        self.carries_orders = carries_orders
+        self.ws = None
+        self.in_flight: Dict[str, Tuple[str, str]] = {}  # rid -> (request type, encoded payload)
+        self.connected = asyncio.Event()
+        self.reconnect: Optional[ReconnectManager] = None
+
+    @property
+    def outstanding(self) -> int:
+        return len(self.in_flight)
+
+
 class GameAPI:
-    def __init__(self, uri: str, team_secret: str):
+    def __init__(self, uri: str, team_secret: str, metrics: Optional[Metrics] = None,
+                 auto_reconnect: bool = True, backoff: Optional[BackoffPolicy] = None,
+                 order_connections: int = 0, bars: bool = True, journal: Optional[Journal] = None,
+                 book_depth: int = 0, exchange_time_ms: int = 1000):
         self.uri = f"{uri}?team_secret={team_secret}"
-        self.ws = None
         self._pending: Dict[str, asyncio.Future] = {}
         self._user_request_id = 0
-
-        self.current_orderbooks: Dict[InstrumentID_t, OrderbookDepth] = {}
-        self.current_candles: Dict[InstrumentID_t, List[Dict[str, Any]]] = defaultdict(list)
-        self.instrument_info: Dict[InstrumentID_t, InstrumentInfo] = {}
+        self._closing = False
+        self._resync_task: Optional[asyncio.Future] = None
+
+        # Per-instrument state lives in lists indexed by the registry's dense
+        # ids; the dict-like attributes below are read-only views keyed by name
+        self.instruments = InstrumentRegistry()
+        self.orderbooks: List[Optional[OrderbookDepth]] = []
+        self.candles: List[Optional[List[Dict[str, Any]]]] = []
+        self.infos: List[Optional[InstrumentInfo]] = []
+        self.histories: List[Optional[deque]] = []  # last 1000 (timestamp, orderbook)
+        self.current_orderbooks = InstrumentTable(self.instruments, self.orderbooks)
+        self.current_candles = InstrumentTable(self.instruments, self.candles)
+        self.instrument_info = InstrumentTable(self.instruments, self.infos)
+        self.orderbook_history = InstrumentTable(self.instruments, self.histories)
+        # Top `book_depth` levels of every book, best first, NaN past the last
+        # level: flat (instruments x book_depth) lists updated as books arrive,
+        # so vector code (strategies.view_from_api) only has to slice them.
+        # Opt-in, the default 0 skips the upkeep
+        self.book_depth = book_depth
+        self.book_levels: Dict[str, List[float]] = {
+            name: [] for name in ("bid_price", "bid_qty", "ask_price", "ask_qty")
+        }
+        self._empty_levels = [math.nan] * book_depth
         self.market_events: List[Dict[str, Any]] = []
+        # MarketDataResponse.time counts game seconds (recorded books run 1497-1527,
+        # next to instruments expiring at 1515) while order expiries are in ms.
+        # Every local use of the exchange clock (last_market_time, expiry tracking,
+        # bars, lag, journal) is in ms: times are scaled by this on arrival
+        self.exchange_time_ms = exchange_time_ms
         self.last_market_time: Optional[Time_t] = None
+        # True until the first snapshot and again whenever the connection drops
+        self.market_data_stale = True
+        self.market_data_fresh = asyncio.Event()
 
-        self.instruments_discovered = set()
+        # Last known account state, refreshed by get_inventory / get_pending_orders
+        self.inventory: Dict[InstrumentID_t, Tuple[Quantity_t, Quantity_t]] = {}
+        self.pending_orders: Dict[InstrumentID_t, Tuple[List[OrderJSON], List[OrderJSON]]] = {}
 
         # Historical data
-        self.orderbook_history: Dict[InstrumentID_t, List[tuple]] = defaultdict(list)  # (timestamp, orderbook)
         self.event_history: List[tuple] = []  # (timestamp, event)
 
-        self.underlying_dfs: Dict[str, pd.DataFrame] = {}
+        self.underlying_dfs: Dict[str, "pd.DataFrame"] = {}
+
+        # Conflated "new market data" notifications, see subscribe_market_data
+        self._market_data_subscribers: List[asyncio.Queue] = []
+
+        # 1s / 5s / 1m OHLCV + VWAP bars for every instrument, built from mids and trades.
+        # Needs numpy, bars=False keeps order-only processes light
+        self.bars: Optional["BarBuilder"] = None
+        if bars:
+            from bars import BarBuilder
+            self.bars = BarBuilder(registry=self.instruments)
+
+        # Local expiry / time-in-force tracking of our resting orders
+        self.order_expiry = OrderExpiryTracker()
+        self.order_expiry.on_auto_cancel = self._auto_cancel_orders
+
+        # Instrumentation, pass Metrics(enabled=False) to turn it off
+        self.metrics = metrics or Metrics()
+        self._m_rtt: Dict[str, Any] = {}
+        self._m_timeouts: Dict[str, Any] = {}
+        self._m_messages = self.metrics.counter("messages_received_total")
+        self._m_bytes = self.metrics.counter("bytes_received_total")
+        self._m_skipped = self.metrics.counter("market_data_skipped_total")
+        self._m_decode = self.metrics.histogram("stage_ns", stage="decode")
+        self._m_parse = self.metrics.histogram("stage_ns", stage="parse")
+        self._m_cache = self.metrics.histogram("stage_ns", stage="cache")
+        self._m_encode = self.metrics.histogram("stage_ns", stage="encode")
+        self._m_pending = self.metrics.gauge("pending_requests")
+        self._m_pending_hist = self.metrics.histogram("pending_requests_depth")
+        self._m_exchange_lag = self.metrics.histogram("exchange_lag_ms")
+        self._m_clock_offset = self.metrics.gauge("exchange_clock_offset_ms")
+        self._min_clock_offset: Optional[int] = None
+
+        # order_connections=0 shares one socket for everything, otherwise one
+        # socket is dedicated to market data and orders are spread over the rest
+        if order_connections:
+            self.connections = [Connection("market_data", carries_orders=False)]
+            self.connections += [Connection(f"orders_{i}", carries_market_data=False) for i in range(order_connections)]
+        else:
+            self.connections = [Connection("main")]
+        self._order_connections = [conn for conn in self.connections if conn.carries_orders]
+        if auto_reconnect:
+            for conn in self.connections:
+                conn.reconnect = ReconnectManager(self, conn, backoff)
+
+        # Durable log of our requests, responses and fills; replayed here so a
+        # restart keeps request ids, order -> strategy tags and positions
+        self.order_strategy: Dict[OrderID_t, str] = {}
+        self.journal = journal
+        self._resync_on_connect = False
+        if journal is not None:
+            self._restore(journal.recover())
+            journal.start()
+
+    @property
+    def ws(self):
+        """Websocket of the first order entry connection"""
+        return self._order_connections[0].ws
 
     async def connect(self):
-
+        """Connect to the AlgoTrade server for trading"""
+        self._closing = False
+        # Back from an earlier disconnect(): resume journaling
+        if self.journal is not None:
+            self.journal.start()
         try : 
-            """Connect to the AlgoTrade server for trading"""
-            logger.info(f"Connecting to {self.uri}")
-            self.ws = await websockets.connect(self.uri)
-            welcome_data = json.loads(await self.ws.recv())
-            welcome_message = WelcomeMessage(**welcome_data)
-            logger.info(f"GameAPI Connected: {welcome_message.message}")
-
+            welcomes = await asyncio.gather(*(self._open(conn) for conn in self.connections))
         except Exception as e:
             logger.error(f"Failed to connect to market: {e}")
+            # The journal stays open, a retry of connect() keeps writing to it
+            await self._close_connections()
             raise
         # Start receiving messages (only for trading responses)
-        asyncio.create_task(self._receive_loop())
+        for conn in self.connections:
+            self._start_receiving(conn)
+            conn.connected.set()
+        # Requests were on the wire when the last process died, only the exchange knows their outcome
+        if self._resync_on_connect:
+            self._resync_on_connect = False
+            asyncio.create_task(self.resync())
+        return welcomes[0]
+
+    async def _open(self, conn: Connection) -> WelcomeMessage:
+        """Open the websocket and consume the welcome message"""
+        logger.info(f"Connecting {conn.name} to {self.uri}")
+        conn.ws = await websockets.connect(self.uri)
+        welcome_data = json.loads(await conn.ws.recv())
+        welcome_message = WelcomeMessage(**welcome_data)
+        logger.info(f"GameAPI {conn.name} connected: {welcome_message.message}")
         return welcome_message
 
+    def _start_receiving(self, conn: Connection):
+        asyncio.create_task(self._receive_loop(conn, conn.ws))
+
+    async def _close_connections(self):
+        self._closing = True
+        for conn in self.connections:
+            conn.connected.clear()
+            if conn.ws:
+                await conn.ws.close()
+
     async def disconnect(self):
         """Disconnect from the server"""
-        if self.ws:
-            await self.ws.close()
-            logger.info("GameAPI disconnected")
+        await self._close_connections()
+        if self.journal is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.journal.close)
+        logger.info("GameAPI disconnected")
+
+    def _restore(self, state: JournalState):
+        """Rebuild local order and position state from a journal replay"""
+        self._user_request_id = max(self._user_request_id, state.next_request_id)
+        self.order_strategy.update(state.order_strategy)
+        self.inventory = {instr_id: tuple(held) for instr_id, held in state.inventory.items()}
+        now = state.market_time
+        for order in state.open_orders.values():
+            self.order_expiry.track(
+                order_id=order.order_id,
+                instrument_id=order.instrument_id,
+                side=order.side,
+                price=order.price,
+                quantity=order.quantity,
+                expiry=order.expiry,
+                now=now,
+                time_in_force_ms=max(0, order.cancel_at - now) if order.cancel_at is not None and now is not None else None
+            )
+        self._resync_on_connect = bool(state.in_doubt)
+
+    def _instrument(self, instrument_id: InstrumentID_t) -> int:
+        """Registry id of an instrument, with a slot in every per-instrument store"""
+        i = self.instruments.ids.get(instrument_id)
+        if i is None:
+            i = self.instruments.intern(instrument_id)
+        if i >= len(self.orderbooks):
+            # Interning may also have registered the underlying
+            extra = len(self.instruments) - len(self.orderbooks)
+            for store in (self.orderbooks, self.candles, self.infos, self.histories):
+                store.extend([None] * extra)
+            for column in self.book_levels.values():
+                column.extend(self._empty_levels * extra)
+        return i
+
+    def _store_levels(self, i: int, orderbook: OrderbookDepth, bid_keys: List[str], ask_keys: List[str]):
+        """Copy the top book_depth levels of a book (keys sorted best first) into book_levels row i"""
+        depth = self.book_depth
+        start, stop = i * depth, (i + 1) * depth
+        columns = self.book_levels
+        for book, keys, prices, qtys in (
+                (orderbook.bids, bid_keys[:depth], columns["bid_price"], columns["bid_qty"]),
+                (orderbook.asks, ask_keys[:depth], columns["ask_price"], columns["ask_qty"])):
+            end = start + len(keys)
+            prices[start:end] = map(float, keys)
+            qtys[start:end] = map(book.__getitem__, keys)
+            if end < stop:
+                prices[end:stop] = qtys[end:stop] = self._empty_levels[:stop - end]
+
+    def _journal(self, event: str, **fields):
+        if self.journal is not None:
+            fields["event"] = event
+            fields["market_time"] = self.last_market_time
+            self.journal.append(fields)
+
+    def _apply_fill(self, instrument_id: InstrumentID_t, change: Quantity_t):
+        """Apply one of our fills to the cached inventory"""
+        reserved, owned = self.inventory.get(instrument_id, (0, 0))
+        self.inventory[instrument_id] = (reserved, owned + change)
+
+    def mark_market_data_stale(self):
+        """Flag cached books as stale until the next market data snapshot"""
+        if not self.market_data_stale:
+            logger.warning("Market data marked stale")
+        self.market_data_stale = True
+        self.market_data_fresh.clear()
+
+    async def resync(self):
+        """Refresh inventory and pending orders, and reconcile locally tracked orders"""
+        # Several order connections may come back at once, share one resync
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = asyncio.ensure_future(self._resync())
+        await asyncio.shield(self._resync_task)
+
+    async def _resync(self):
+        resp = await self.get_pending_orders()
+        if not isinstance(resp, GetPendingOrdersResponse):
+            await self.get_inventory()
+            return
+
+        live = {}
+        for instr_id, (bids, asks) in resp.data.items():
+            for order in bids + asks:
+                live[order.orderID] = (instr_id, order)
+        for order_id in list(self.order_expiry.orders):
+            if order_id not in live:
+                self.order_expiry.untrack(order_id)
+        for order_id, (instr_id, order) in live.items():
+            tracked = self.order_expiry.orders.get(order_id)
+            if tracked is not None and order.unfilled_quantity < tracked.quantity:
+                self._journal("fill", order_id=order_id, instrument_id=instr_id, side=order.side, price=order.price,
+                              quantity=tracked.quantity - order.unfilled_quantity,
+                              strategy=self.order_strategy.get(order_id))
+                tracked.quantity = order.unfilled_quantity
+            if tracked is None:
+                self.order_expiry.track(
+                    order_id=order_id,
+                    instrument_id=instr_id,
+                    side=order.side,
+                    price=order.price,
+                    quantity=order.unfilled_quantity,
+                    expiry=order.expiry,
+                    now=self.last_market_time
+                )
+        self._journal("orders", orders=[[order_id, instr_id, order.side, order.price, order.unfilled_quantity, order.expiry]
+                                        for order_id, (instr_id, order) in live.items()])
+        # Inventory last: it already includes the fills found above
+        await self.get_inventory()
+        logger.info(f"Resynced {len(live)} pending orders across {len(resp.data)} instruments")
 
-    async def _receive_loop(self):
+    async def _receive_loop(self, conn: Connection, ws):
         """Internal loop to receive trading responses"""
-        assert self.ws, "Websocket connection not established."
+        assert ws, "Websocket connection not established."
+        skip_market_data = not conn.carries_market_data
 
         try:
-            async for msg in self.ws:
+            async for msg in ws:
+                # Another connection owns market data, don't pay for decoding it twice
+                if skip_market_data and _MARKET_DATA_TAG in msg[:_MARKET_DATA_TAG_WINDOW]:
+                    self._m_skipped.inc()
+                    continue
+
+                t0 = time.perf_counter_ns()
                 data = json.loads(msg)
+                self._m_decode.record(time.perf_counter_ns() - t0)
+                self._m_messages.inc()
+                self._m_bytes.inc(len(msg))
 
                 # Only handle responses with request IDs (trading responses)
                 rid = data.get("user_request_id")
                 if rid and rid in self._pending:
-                    self._pending[rid].set_result(data)
-                    del self._pending[rid]
+                    fut = self._pending.pop(rid)
+                    # The caller may have been cancelled while waiting
+                    if not fut.done():
+                        fut.set_result(data)
+                    conn.in_flight.pop(rid, None)
+                    self._m_pending.set(len(self._pending))
 
                 # We don't process market data here - that's handled by MarketDataCache
                 msg_type = data.get("type")
-                if msg_type == "market_data_update":
+                if msg_type == "market_data_update" and not skip_market_data:
                     #logger.info(f"Market data update received: {data}")
                     self._process_market_data_update(data)
 
         except websockets.exceptions.ConnectionClosed:
-            logger.warning("GameAPI WebSocket connection closed")
+            logger.warning(f"GameAPI WebSocket connection {conn.name} closed")
         except Exception as e:
-            logger.error(f"Error in GameAPI receive loop: {e}")
-
-    async def _send(self, payload: BaseMessage, timeout: int = 3):
+            logger.error(f"Error in GameAPI receive loop ({conn.name}): {e}")
+
+        if not self._closing and conn.reconnect and ws is conn.ws:
+            conn.reconnect.connection_lost()
+
+    def _encode(self, payload: BaseMessage) -> str:
+        """Serialize an outgoing request"""
+        return json.dumps(asdict(payload))
+
+    async def _pick_connection(self, timeout: float) -> Connection:
+        """Connected order connection with the fewest requests in flight"""
+        connected = [conn for conn in self._order_connections if conn.connected.is_set()]
+        if not connected:
+            # All reconnecting, hold the request until one is back
+            waiters = [asyncio.ensure_future(conn.connected.wait()) for conn in self._order_connections]
+            try:
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+            if not done:
+                raise asyncio.TimeoutError()
+            connected = [conn for conn in self._order_connections if conn.connected.is_set()]
+        if len(connected) == 1:
+            return connected[0]
+        return min(connected, key=lambda conn: conn.outstanding)
+
+    async def _send(self, payload: BaseMessage, timeout: int = 3, strategy: Optional[str] = None):
         """Internal method to send messages and wait for responses"""
         rid = str(self._user_request_id).zfill(10)
         self._user_request_id += 1
 
         payload.user_request_id = rid
-        payload_dict = asdict(payload)
+        t0 = time.perf_counter_ns()
+        encoded = self._encode(payload)
+        t1 = time.perf_counter_ns()
+        self._m_encode.record(t1 - t0)
+
+        conn = await self._pick_connection(timeout)
+
+        if payload.type == "add_order":
+            self._journal("sent", rid=rid, instrument_id=payload.instrument_id, side=payload.side, price=payload.price,
+                          quantity=payload.quantity, expiry=payload.expiry, strategy=strategy)
+        elif payload.type == "cancel_order":
+            self._journal("cancel_sent", rid=rid, order_id=payload.order_id, instrument_id=payload.instrument_id)
 
         fut = asyncio.get_event_loop().create_future()
         self._pending[rid] = fut
+        conn.in_flight[rid] = (payload.type, encoded)
+        self._m_pending.set(len(self._pending))
+        self._m_pending_hist.record(len(self._pending))
 
-        await self.ws.send(json.dumps(payload_dict))
-        logger.debug(f"Sent request {rid}: {payload.type}")
+        try:
+            await conn.ws.send(encoded)
+        except websockets.exceptions.ConnectionClosed:
+            if not conn.reconnect:
+                self._pending.pop(rid, None)
+                conn.in_flight.pop(rid, None)
+                raise
+            # The socket is known dead: recover now rather than wait for the receive
+            # loop to notice, the reconnect manager replays or fails the request
+            conn.reconnect.connection_lost()
+        logger.debug(f"Sent request {rid} on {conn.name}: {payload.type}")
 
         try:
             resp = await asyncio.wait_for(fut, timeout)
+            rtt = self._m_rtt.get(payload.type)
+            if rtt is None:
+                rtt = self._m_rtt[payload.type] = self.metrics.histogram("request_rtt_ns", type=payload.type)
+            rtt.record(time.perf_counter_ns() - t1)
 
             # Parse response based on type
             if resp.get("type") == "add_order_response":
@@ -246,11 +568,18 @@ class GameAPI:
         except asyncio.TimeoutError:
             if rid in self._pending:
                 del self._pending[rid]
+            conn.in_flight.pop(rid, None)
+            self._m_pending.set(len(self._pending))
+            timeouts = self._m_timeouts.get(payload.type)
+            if timeouts is None:
+                timeouts = self._m_timeouts[payload.type] = self.metrics.counter("request_timeouts_total", type=payload.type)
+            timeouts.inc()
             raise TimeoutError(f"Request {rid} timed out")
 
     # ========== Trading Methods ==========
 
-    async def buy_future(self, underlying: str, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1):
+    async def buy_future(self, underlying: str, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1, time_in_force_ms: Optional[int] = None,
+                         strategy: Optional[str] = None):
         """Buy a future contract"""
         instrument_id = f"{underlying}_future_{expiry_seconds}"
         expiry_ms = (expiry_seconds + 10) * 1000
@@ -263,9 +592,10 @@ class GameAPI:
             side="bid",
             expiry=expiry_ms
         )
-        return await self._send(order)
+        return await self._submit_order(order, time_in_force_ms, strategy)
 
-    async def sell_future(self, underlying: str, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1):
+    async def sell_future(self, underlying: str, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1, time_in_force_ms: Optional[int] = None,
+                          strategy: Optional[str] = None):
         """Sell a future contract"""
         instrument_id = f"{underlying}_future_{expiry_seconds}"
         expiry_ms = (expiry_seconds + 10) * 1000
@@ -278,9 +608,10 @@ class GameAPI:
             side="ask",
             expiry=expiry_ms
         )
-        return await self._send(order)
+        return await self._submit_order(order, time_in_force_ms, strategy)
 
-    async def buy_call(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1):
+    async def buy_call(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1, time_in_force_ms: Optional[int] = None,
+                       strategy: Optional[str] = None):
         """Buy a call option"""
         instrument_id = f"{underlying}_call_{strike}_{expiry_seconds}"
         expiry_ms = (expiry_seconds + 10) * 1000
@@ -293,9 +624,10 @@ class GameAPI:
             side="bid",
             expiry=expiry_ms
         )
-        return await self._send(order)
+        return await self._submit_order(order, time_in_force_ms, strategy)
 
-    async def sell_call(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1):
+    async def sell_call(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1, time_in_force_ms: Optional[int] = None,
+                        strategy: Optional[str] = None):
         """Sell a call option"""
         instrument_id = f"{underlying}_call_{strike}_{expiry_seconds}"
         expiry_ms = (expiry_seconds + 10) * 1000
@@ -308,9 +640,10 @@ class GameAPI:
             side="ask",
             expiry=expiry_ms
         )
-        return await self._send(order)
+        return await self._submit_order(order, time_in_force_ms, strategy)
 
-    async def buy_put(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1):
+    async def buy_put(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1, time_in_force_ms: Optional[int] = None,
+                      strategy: Optional[str] = None):
         """Buy a put option"""
         instrument_id = f"{underlying}_put_{strike}_{expiry_seconds}"
         expiry_ms = (expiry_seconds + 10) * 1000
@@ -323,9 +656,10 @@ class GameAPI:
             side="bid",
             expiry=expiry_ms
         )
-        return await self._send(order)
+        return await self._submit_order(order, time_in_force_ms, strategy)
 
-    async def sell_put(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1):
+    async def sell_put(self, underlying: str, strike: Price_t, expiry_seconds: int, price: Price_t, quantity: Quantity_t = 1, time_in_force_ms: Optional[int] = None,
+                       strategy: Optional[str] = None):
         """Sell a put option"""
         instrument_id = f"{underlying}_put_{strike}_{expiry_seconds}"
         expiry_ms = (expiry_seconds + 10) * 1000
@@ -338,7 +672,66 @@ class GameAPI:
             side="ask",
             expiry=expiry_ms
         )
-        return await self._send(order)
+        return await self._submit_order(order, time_in_force_ms, strategy)
+
+    async def _submit_order(self, order: AddOrderRequest, time_in_force_ms: Optional[int] = None,
+                            strategy: Optional[str] = None):
+        """Send an order and start tracking it locally if it rests on the book"""
+        resp = await self._send(order, strategy=strategy)
+        rid = order.user_request_id
+        if isinstance(resp, AddOrderResponse) and resp.success and resp.data.order_id:
+            order_id = resp.data.order_id
+            change = resp.data.immediate_inventory_change or 0
+            filled = abs(change)
+            tracked = None
+            if filled < order.quantity:
+                tracked = self.order_expiry.track(
+                    order_id=order_id,
+                    instrument_id=order.instrument_id,
+                    side=order.side,
+                    price=order.price,
+                    quantity=order.quantity - filled,
+                    expiry=order.expiry,
+                    now=self.last_market_time,
+                    time_in_force_ms=time_in_force_ms
+                )
+            if strategy:
+                self.order_strategy[order_id] = strategy
+            self._journal("ack", rid=rid, order_id=order_id, instrument_id=order.instrument_id, side=order.side,
+                          price=order.price, quantity=order.quantity, resting=order.quantity - filled,
+                          expiry=order.expiry, cancel_at=tracked.cancel_at if tracked else None, strategy=strategy)
+            if filled:
+                # Average price from the cash moved, the limit price if the exchange didn't say
+                balance = resp.data.immediate_balance_change
+                price = abs(balance) / filled if balance else order.price
+                self._apply_fill(order.instrument_id, change)
+                self._journal("fill", rid=rid, order_id=order_id, instrument_id=order.instrument_id, side=order.side,
+                              price=price, quantity=filled, immediate=True, strategy=strategy)
+        elif isinstance(resp, (AddOrderResponse, ErrorResponse)):
+            message = resp.message if isinstance(resp, ErrorResponse) else resp.data.message
+            self._journal("reject", rid=rid, instrument_id=order.instrument_id, side=order.side, price=order.price,
+                          quantity=order.quantity, message=message, strategy=strategy)
+        return resp
+
+    async def add_order(self, instrument_id: InstrumentID_t, side: str, price: Price_t, quantity: Quantity_t = 1,
+                        expiry_ms: Optional[Time_t] = None, time_in_force_ms: Optional[int] = None,
+                        strategy: Optional[str] = None):
+        """Place an order on any instrument, the expiry defaults to the instrument's own"""
+        if expiry_ms is None:
+            i = self._instrument(instrument_id)
+            if self.instruments.kind[i] not in (KIND_FUTURE, KIND_CALL, KIND_PUT):
+                raise ValueError(f"No expiry in instrument id {instrument_id}, pass expiry_ms")
+            expiry_ms = (self.instruments.expiry[i] + 10) * 1000
+
+        order = AddOrderRequest(
+            user_request_id="",
+            instrument_id=instrument_id,
+            price=price,
+            quantity=quantity,
+            side=side,
+            expiry=expiry_ms
+        )
+        return await self._submit_order(order, time_in_force_ms, strategy)
 
     async def cancel_order(self, instrument_id: InstrumentID_t, order_id: OrderID_t):
         """Cancel an existing order"""
@@ -347,99 +740,158 @@ class GameAPI:
             order_id=order_id,
             instrument_id=instrument_id
         )
-        return await self._send(cancel_req)
+        resp = await self._send(cancel_req)
+        if isinstance(resp, CancelOrderResponse) and resp.success:
+            self.order_expiry.untrack(order_id)
+            self._journal("cancel", rid=cancel_req.user_request_id, order_id=order_id, instrument_id=instrument_id)
+        elif isinstance(resp, (CancelOrderResponse, ErrorResponse)):
+            self._journal("cancel_reject", rid=cancel_req.user_request_id, order_id=order_id,
+                          instrument_id=instrument_id, message=resp.message)
+        return resp
+
+    def _auto_cancel_orders(self, orders: List[TrackedOrder]):
+        """Cancel a batch of orders whose local time-in-force elapsed"""
+        logger.debug(f"Auto-cancelling {len(orders)} orders")
+        asyncio.create_task(self._auto_cancel(orders))
+
+    async def _auto_cancel(self, orders: List[TrackedOrder]):
+        results = await asyncio.gather(
+            *(self.cancel_order(order.instrument_id, order.order_id) for order in orders),
+            return_exceptions=True
+        )
+        for order, result in zip(orders, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Auto-cancel of {order.order_id} failed: {result}")
 
     async def get_inventory(self):
         """Get current inventory (cash and holdings)"""
         req = GetInventoryRequest(user_request_id="")
-        return await self._send(req)
+        resp = await self._send(req)
+        if isinstance(resp, GetInventoryResponse):
+            # _apply_fill updates our copy in place, the journal gets its own snapshot
+            self.inventory = dict(resp.data)
+            self._journal("inventory", data={instr_id: list(held) for instr_id, held in resp.data.items()})
+        return resp
 
     async def get_pending_orders(self):
         """Get all pending orders"""
         req = GetPendingOrdersRequest(user_request_id="")
-        return await self._send(req)
+        resp = await self._send(req)
+        if isinstance(resp, GetPendingOrdersResponse):
+            self.pending_orders = resp.data
+        return resp
     
 
     def _process_market_data_update(self, data: Dict[str, Any]):
         """Process incoming market data update"""
         try:
-            # Parse orderbook depths
-            parsed_orderbook_depths = {}
-            for instr_id, depth_data in data.get("orderbook_depths", {}).items():
-                parsed_orderbook_depths[instr_id] = OrderbookDepth(**depth_data)
-            
-            # Parse candles
-            parsed_candles = CandleDataResponse(**data.get("candles", {}))
-            
-            # Create market data response
-            market_data = MarketDataResponse(
-                type=data["type"],
-                time=data["time"],
-                candles=parsed_candles,
-                orderbook_depths=parsed_orderbook_depths,
-                events=data.get("events", []),
-                user_request_id=data.get("user_request_id")
-            )
+            t0 = time.perf_counter_ns()
+            market_data = self._parse_market_data(data)
+            t1 = time.perf_counter_ns()
+            self._m_parse.record(t1 - t0)
             self._cache_market_data(market_data)
+            self._m_cache.record(time.perf_counter_ns() - t1)
         
         except Exception as e:
             logger.error(f"Error processing market data update: {e}")
 
+    def _parse_market_data(self, data: Dict[str, Any]) -> MarketDataResponse:
+        """Build a MarketDataResponse from a decoded market_data_update"""
+        # Parse orderbook depths
+        parsed_orderbook_depths = {}
+        for instr_id, depth_data in data.get("orderbook_depths", {}).items():
+            parsed_orderbook_depths[instr_id] = OrderbookDepth(**depth_data)
+        
+        # Parse candles
+        parsed_candles = CandleDataResponse(**data.get("candles", {}))
+        
+        # Create market data response
+        return MarketDataResponse(
+            type=data["type"],
+            time=data["time"],
+            candles=parsed_candles,
+            orderbook_depths=parsed_orderbook_depths,
+            events=data.get("events", []),
+            user_request_id=data.get("user_request_id")
+        )
+
 
     def _cache_market_data(self, data: MarketDataResponse):
         """Cache the market data update"""
-        current_time = data.time
+        current_time = int(data.time * self.exchange_time_ms)
         self.last_market_time = current_time
+        if self.market_data_stale:
+            self.market_data_stale = False
+            self.market_data_fresh.set()
+            logger.info("Market data fresh")
+
+        # Lag = clock offset above the smallest offset seen, i.e. extra delay
+        # on top of the best observed transit (works for any exchange epoch)
+        offset = int(time.time() * 1000) - current_time
+        if self._min_clock_offset is None or offset < self._min_clock_offset:
+            self._min_clock_offset = offset
+        self._m_clock_offset.set(offset)
+        self._m_exchange_lag.record(offset - self._min_clock_offset)
+
+        # Fire local expiries / time-in-force cancels due by the exchange clock (no-op when nothing rests)
+        if self.order_expiry:
+            self.order_expiry.advance(current_time)
         
+        mid_ids, mids = [], []
+
         # Update orderbooks and instrument info
+        ids = self.instruments.ids
         for instr_id, orderbook in data.orderbook_depths.items():
-            # Cache current orderbook
-            self.current_orderbooks[instr_id] = orderbook
-            
-            # Store in history (keep last 1000 entries per instrument)
-            history = self.orderbook_history[instr_id]
-            history.append((current_time, orderbook))
-            if len(history) > 1000:
-                history.pop(0)
-            
-            # Update instrument info
-            if instr_id not in self.instrument_info:
-                self.instrument_info[instr_id] = InstrumentInfo(
+            i = ids.get(instr_id)
+            if i is None or i >= len(self.infos) or self.infos[i] is None:
+                i = self._instrument(instr_id)
+                self.infos[i] = InstrumentInfo(
                     instrument_id=instr_id,
                     first_seen=current_time,
                     last_updated=current_time
                 )
-                self.instruments_discovered.add(instr_id)
+                # Store in history (keep last 1000 entries per instrument)
+                self.histories[i] = deque(maxlen=1000)
                 logger.info(f"New instrument discovered: {instr_id}")
-                
-                # Only log basic info for first few instruments
-                # if len(self.instruments_discovered) <= 3:
-                #     logger.debug(f"Sample orderbook structure for {instr_id}: bids={len(orderbook.bids)}, asks={len(orderbook.asks)}")
-            
+
+            # Cache current orderbook
+            self.orderbooks[i] = orderbook
+            self.histories[i].append((current_time, orderbook))
+
             # Update best prices and volumes
-            instrument = self.instrument_info[instr_id]
+            instrument = self.infos[i]
             instrument.last_updated = current_time
             
+            # Price keys (strings over JSON) sorted best first, reused for book_levels
+            bid_keys = ask_keys = ()
             if orderbook.bids:
-                # Convert string keys to int for comparison
-                bid_prices = [int(price) if isinstance(price, str) else price for price in orderbook.bids.keys()]
-                best_bid_price = max(bid_prices)
+                bid_keys = sorted(orderbook.bids, key=int, reverse=True)
+                best_bid_price = int(bid_keys[0])
                 instrument.best_bid = best_bid_price
                 instrument.bid_volume = sum(int(qty) if isinstance(qty, str) else qty for qty in orderbook.bids.values())
             
             if orderbook.asks:
-                # Convert string keys to int for comparison
-                ask_prices = [int(price) if isinstance(price, str) else price for price in orderbook.asks.keys()]
-                best_ask_price = min(ask_prices)
+                ask_keys = sorted(orderbook.asks, key=int)
+                best_ask_price = int(ask_keys[0])
                 instrument.best_ask = best_ask_price
                 instrument.ask_volume = sum(int(qty) if isinstance(qty, str) else qty for qty in orderbook.asks.values())
+
+            if orderbook.bids and orderbook.asks:
+                mid_ids.append(i)
+                mids.append((best_bid_price + best_ask_price) / 2)
+
+            if self.book_depth:
+                self._store_levels(i, orderbook, bid_keys, ask_keys)
+
+        if self.bars is not None:
+            self.bars.on_mid_ids(current_time, mid_ids, mids)
         
         #logger.info(f"Market data update processed: {self.current_orderbooks}")
         # Cache candle data
         for category in ['tradeable', 'untradeable']:
             category_data = getattr(data.candles, category, {})
             for instr_id, candles in category_data.items():
-                self.current_candles[instr_id] = candles
+                self.candles[self._instrument(instr_id)] = candles
         
         # Cache events
         for event in data.events:
@@ -449,6 +901,9 @@ class GameAPI:
             # Log significant events
             if event.get('type') in ['trade', 'settlement']:
                 logger.info(f"Market event: {event}")
+
+            if self.bars is not None and event.get('type') == 'trade' and event.get('instrument_id') and event.get('price') is not None:
+                self.bars.on_trade(current_time, event['instrument_id'], event['price'], event.get('quantity', 0))
             
             # Keep only last 10000 events
             if len(self.market_events) > 10000:
@@ -456,12 +911,29 @@ class GameAPI:
             if len(self.event_history) > 10000:
                 self.event_history.pop(0)
 
+        if self._market_data_subscribers:
+            self._notify_market_data(current_time)
+
+    def subscribe_market_data(self) -> asyncio.Queue:
+        """Queue receiving the exchange time of each update, conflated to the latest one"""
+        queue = asyncio.Queue(maxsize=1)
+        self._market_data_subscribers.append(queue)
+        return queue
+
+    def _notify_market_data(self, current_time: Time_t):
+        for queue in self._market_data_subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(current_time)
+
     def _get_instrument_info(self, instrument_id: InstrumentID_t) -> Optional[InstrumentInfo]:
         """Get information about an instrument"""
         return self.current_orderbooks[instrument_id]
 
     def update_underlying_dfs(self):
         """Update the underlying DataFrames"""
+        import pandas as pd
+
         for instr_id, candles in self.current_candles.items() :
             if instr_id in ['$JUMP', '$GARR', '$CARD', '$HEST', '$LOGN', '$SIMP']:
 
@@ -0,0 +1,192 @@
+import logging
+from typing import Optional, List, Dict, Sequence
+
+import numpy as np
+
+from instruments import InstrumentRegistry
+
+logger = logging.getLogger(__name__)
+
+InstrumentID_t = str
+Time_t = int
+
+BAR_FIELDS = ("open", "high", "low", "close", "volume", "notional")
+_OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _NOTIONAL = range(len(BAR_FIELDS))
+
+
+class BarSeries:
+    """Bars of a single resolution for every instrument.
+
+    All instruments share the exchange clock, so they roll over together:
+    the bar being built is one (fields, instruments) array and closing it is
+    a single column copy into a preallocated ring of `history` bars.
+    """
+
+    def __init__(self, resolution_ms: int, history: int, capacity: int):
+        self.resolution_ms = resolution_ms
+        self.history = history
+        self.current = np.full((len(BAR_FIELDS), capacity), np.nan)
+        self.current[_VOLUME] = 0
+        self.current[_NOTIONAL] = 0
+        self.closed = np.full((history, len(BAR_FIELDS), capacity), np.nan)
+        self.closed_start = np.zeros(history, dtype=np.int64)
+        self.last_close = np.full(capacity, np.nan)
+        self.n_closed = 0
+        self.start: Optional[Time_t] = None  # start of the bar being built
+
+    def _grow(self, capacity: int):
+        extra = capacity - self.current.shape[1]
+        pad = np.full((len(BAR_FIELDS), extra), np.nan)
+        pad[_VOLUME] = 0
+        pad[_NOTIONAL] = 0
+        self.current = np.concatenate([self.current, pad], axis=1)
+        self.last_close = np.concatenate([self.last_close, np.full(extra, np.nan)])
+        self.closed = np.concatenate([self.closed, np.full((self.history, len(BAR_FIELDS), extra), np.nan)], axis=2)
+
+    def _close(self, bar: np.ndarray, start: Time_t):
+        slot = self.n_closed % self.history
+        self.closed[slot] = bar
+        self.closed_start[slot] = start
+        self.n_closed += 1
+
+    def roll(self, time: Time_t):
+        """Close every bar that ended before `time`.
+
+        Instruments without a price during a bar get a flat bar at their last
+        close, so every resolution has one bar per period for everyone.
+        """
+        start = time - time % self.resolution_ms
+        if self.start is None:
+            self.start = start
+            return
+        if start <= self.start:
+            return
+
+        bar = self.current
+        quiet = np.isnan(bar[_OPEN])
+        for k in (_OPEN, _HIGH, _LOW, _CLOSE):
+            bar[k, quiet] = self.last_close[quiet]
+        self._close(bar, self.start)
+        self.last_close = bar[_CLOSE].copy()
+
+        # Whole periods without any update
+        gaps = (start - self.start) // self.resolution_ms - 1
+        if gaps:
+            flat = np.zeros_like(bar)
+            flat[_OPEN:_CLOSE + 1] = self.last_close
+            first_gap = max(1, gaps - self.history + 1)
+            for g in range(first_gap, gaps + 1):
+                self._close(flat, self.start + g * self.resolution_ms)
+
+        bar[_OPEN:_CLOSE + 1] = np.nan
+        bar[_VOLUME] = 0
+        bar[_NOTIONAL] = 0
+        self.start = start
+
+    def update_prices(self, index: np.ndarray, prices: np.ndarray):
+        bar = self.current
+        fresh = np.isnan(bar[_OPEN, index])
+        bar[_OPEN, index[fresh]] = prices[fresh]
+        bar[_HIGH, index] = np.fmax(bar[_HIGH, index], prices)
+        bar[_LOW, index] = np.fmin(bar[_LOW, index], prices)
+        bar[_CLOSE, index] = prices
+
+    def update_trade(self, i: int, price: float, quantity: float):
+        bar = self.current
+        if np.isnan(bar[_OPEN, i]):
+            bar[_OPEN, i] = price
+        bar[_HIGH, i] = np.fmax(bar[_HIGH, i], price)
+        bar[_LOW, i] = np.fmin(bar[_LOW, i], price)
+        bar[_CLOSE, i] = price
+        bar[_VOLUME, i] += quantity
+        bar[_NOTIONAL, i] += price * quantity
+
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        """Closed bars oldest first, shape (bars, fields, instruments)"""
+        available = min(self.n_closed, self.history)
+        n = available if n is None else min(n, available)
+        slots = np.arange(self.n_closed - n, self.n_closed) % self.history
+        return self.closed[slots]
+
+    def last_start(self, n: Optional[int] = None) -> np.ndarray:
+        available = min(self.n_closed, self.history)
+        n = available if n is None else min(n, available)
+        return self.closed_start[np.arange(self.n_closed - n, self.n_closed) % self.history]
+
+
+class BarBuilder:
+    """Incremental OHLCV / VWAP bars at several resolutions for every instrument.
+
+    Prices come from book mids and trades, volume and VWAP from trades only.
+    Bars with no trade have zero volume and a NaN VWAP. Instruments are
+    indexed by their InstrumentRegistry id, pass GameAPI's registry to share it.
+    """
+
+    def __init__(self, resolutions_ms: Sequence[int] = (1000, 5000, 60000), history: int = 600, capacity: int = 256,
+                 registry: Optional[InstrumentRegistry] = None):
+        self.registry = registry if registry is not None else InstrumentRegistry()
+        self.instrument_index: Dict[InstrumentID_t, int] = self.registry.ids
+        self.instruments: List[InstrumentID_t] = self.registry.names
+        self.capacity = capacity
+        self.series: Dict[int, BarSeries] = {res: BarSeries(res, history, capacity) for res in resolutions_ms}
+        self._ensure_capacity()
+
+    def _ensure_capacity(self):
+        if len(self.registry) <= self.capacity:
+            return
+        while self.capacity < len(self.registry):
+            self.capacity *= 2
+        for series in self.series.values():
+            series._grow(self.capacity)
+
+    def _index(self, instrument_id: InstrumentID_t) -> int:
+        i = self.registry.intern(instrument_id)
+        if i >= self.capacity:
+            self._ensure_capacity()
+        return i
+
+    def on_mids(self, time: Time_t, instrument_ids: Sequence[InstrumentID_t], mids: Sequence[float]):
+        """Feed one market data update worth of mid prices"""
+        index = [self.registry.intern(i) for i in instrument_ids]
+        self.on_mid_ids(time, index, mids)
+
+    def on_mid_ids(self, time: Time_t, index: Sequence[int], mids: Sequence[float]):
+        """on_mids with instruments given by registry id"""
+        self._ensure_capacity()
+        index = np.asarray(index, dtype=np.intp)
+        prices = np.asarray(mids, dtype=np.float64)
+        for series in self.series.values():
+            series.roll(time)
+            if len(index):
+                series.update_prices(index, prices)
+
+    def on_trade(self, time: Time_t, instrument_id: InstrumentID_t, price: float, quantity: float):
+        i = self._index(instrument_id)
+        for series in self.series.values():
+            series.roll(time)
+            series.update_trade(i, price, quantity)
+
+    def bars(self, instrument_id: InstrumentID_t, resolution_ms: int, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Closed bars of one instrument, oldest first"""
+        self._ensure_capacity()
+        series = self.series[resolution_ms]
+        i = self.instrument_index[instrument_id]
+        closed = series.last(n)[:, :, i]
+        out = {field: closed[:, k] for k, field in enumerate(BAR_FIELDS)}
+        out["time"] = series.last_start(n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["vwap"] = out["notional"] / out["volume"]
+        return out
+
+    def latest(self, resolution_ms: int) -> Dict[str, np.ndarray]:
+        """Last closed bar of every instrument, indexed like `instruments`"""
+        self._ensure_capacity()  # the shared registry may have grown elsewhere
+        series = self.series[resolution_ms]
+        n = len(self.instruments)
+        if not series.n_closed:
+            return {field: np.full(n, np.nan) for field in BAR_FIELDS + ("vwap",)}
+        bar = series.closed[(series.n_closed - 1) % series.history][:, :n]
+        out = {field: bar[k] for k, field in enumerate(BAR_FIELDS)}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["vwap"] = out["notional"] / out["volume"]
+        return out
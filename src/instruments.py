@@ -0,0 +1,132 @@
+import logging
+from array import array
+from collections.abc import Mapping
+from typing import Optional, List, Dict, Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+InstrumentID_t = str
+
+KINDS = ("underlying", "future", "call", "put")
+KIND_UNKNOWN = -1
+KIND_UNDERLYING, KIND_FUTURE, KIND_CALL, KIND_PUT = range(len(KINDS))
+
+
+def parse_instrument_id(instrument_id: InstrumentID_t) -> Optional[Dict[str, Any]]:
+    """Split `$JUMP`, `$JUMP_future_300` or `$JUMP_call_10000_300` into its parts"""
+    parts = instrument_id.split("_")
+    if len(parts) == 1:
+        return {"type": "underlying", "underlying": parts[0]}
+    try:
+        if parts[1] == "future" and len(parts) == 3:
+            return {"type": "future", "underlying": parts[0], "expiry_seconds": int(parts[2])}
+        if parts[1] in ("call", "put") and len(parts) == 4:
+            return {"type": parts[1], "underlying": parts[0], "strike": int(parts[2]), "expiry_seconds": int(parts[3])}
+    except ValueError:
+        pass
+    return None
+
+
+class InstrumentRegistry:
+    """Dense integer id per instrument, assigned the first time it is seen.
+
+    Metadata is parsed once and kept in parallel arrays indexed by that id:
+    `kind` (index into KINDS, -1 if the id doesn't parse), `underlying` (id
+    of the underlying, interned alongside), `strike` and `expiry` (seconds,
+    as in the instrument id; -1 where it doesn't apply). Plain `array`s keep
+    numpy off the order path, columns() gives numpy copies for vector code.
+    """
+
+    def __init__(self):
+        self.ids: Dict[InstrumentID_t, int] = {}
+        self.names: List[InstrumentID_t] = []
+        self.kind = array("b")
+        self.underlying = array("q")
+        self.strike = array("q")
+        self.expiry = array("q")
+        self._columns: Optional[Dict[str, Any]] = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, instrument_id: InstrumentID_t) -> bool:
+        return instrument_id in self.ids
+
+    def intern(self, instrument_id: InstrumentID_t) -> int:
+        """Id of an instrument, registering it (and its underlying) if new"""
+        i = self.ids.get(instrument_id)
+        if i is not None:
+            return i
+
+        parsed = parse_instrument_id(instrument_id)
+        underlying = -1
+        if parsed is not None and parsed["type"] != "underlying":
+            underlying = self.intern(parsed["underlying"])
+
+        i = self.ids[instrument_id] = len(self.names)
+        self.names.append(instrument_id)
+        if parsed is None:
+            logger.warning(f"Unrecognized instrument id: {instrument_id}")
+            self.kind.append(KIND_UNKNOWN)
+        else:
+            self.kind.append(KINDS.index(parsed["type"]))
+        self.underlying.append(i if underlying < 0 and parsed is not None else underlying)
+        self.strike.append(parsed.get("strike", -1) if parsed else -1)
+        self.expiry.append(parsed.get("expiry_seconds", -1) if parsed else -1)
+        self._columns = None
+        return i
+
+    def describe(self, instrument_id: InstrumentID_t) -> Optional[Dict[str, Any]]:
+        """Metadata of an instrument in the parse_instrument_id format"""
+        i = self.intern(instrument_id)
+        kind = self.kind[i]
+        if kind == KIND_UNKNOWN:
+            return None
+        info = {"type": KINDS[kind], "underlying": self.names[self.underlying[i]]}
+        if kind != KIND_UNDERLYING:
+            info["expiry_seconds"] = self.expiry[i]
+        if kind in (KIND_CALL, KIND_PUT):
+            info["strike"] = self.strike[i]
+        return info
+
+    def columns(self) -> Dict[str, Any]:
+        """Metadata as numpy arrays indexed by id, rebuilt only after new instruments"""
+        if self._columns is None or len(self._columns["kind"]) != len(self.names):
+            import numpy as np
+            self._columns = {
+                "kind": np.array(self.kind, dtype=np.int8),
+                "underlying": np.array(self.underlying, dtype=np.intp),
+                "strike": np.array(self.strike, dtype=np.int64),
+                "expiry": np.array(self.expiry, dtype=np.int64),
+            }
+            # Shared by every caller until the next instrument shows up
+            for column in self._columns.values():
+                column.flags.writeable = False
+        return self._columns
+
+
+class InstrumentTable(Mapping):
+    """Read-only instrument_id -> value view of a list indexed by registry id.
+
+    Slots holding None (instrument known but nothing stored yet) are absent.
+    """
+
+    def __init__(self, registry: InstrumentRegistry, values: List[Any]):
+        self.registry = registry
+        self.values_by_id = values
+
+    def __getitem__(self, instrument_id: InstrumentID_t) -> Any:
+        i = self.registry.ids.get(instrument_id)
+        if i is None or i >= len(self.values_by_id) or self.values_by_id[i] is None:
+            raise KeyError(instrument_id)
+        return self.values_by_id[i]
+
+    def __iter__(self) -> Iterator[InstrumentID_t]:
+        names = self.registry.names
+        return (names[i] for i, value in enumerate(self.values_by_id) if value is not None)
+
+    def __len__(self) -> int:
+        return sum(value is not None for value in self.values_by_id)
+
+    def __repr__(self):
+        return f"InstrumentTable({dict(self.items())})"
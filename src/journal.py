@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Iterator
+
+logger = logging.getLogger(__name__)
+
+InstrumentID_t = str
+Price_t = int
+Time_t = int
+Quantity_t = int
+OrderID_t = str
+
+# Checkpoint lines start with this so recovery can find the last one without parsing
+_CHECKPOINT = b'{"event":"checkpoint"'
+_SCAN_BLOCK = 1 << 20
+
+
+@dataclass
+class JournaledOrder:
+    order_id: OrderID_t
+    instrument_id: InstrumentID_t
+    side: str
+    price: Price_t
+    quantity: Quantity_t  # still resting
+    expiry: Time_t
+    cancel_at: Optional[Time_t] = None  # local time-in-force deadline, exchange clock
+    strategy: Optional[str] = None
+
+
+@dataclass
+class JournalState:
+    """Order and position state rebuilt by replaying a journal.
+
+    Events (one JSON object per line, same schema as logs/analytics.py):
+        sent / cancel_sent   request written to the wire
+        ack / reject         add_order response, `resting` is what is left on the book
+        cancel / cancel_reject
+        fill                 our order traded, `quantity` > 0, `side` of our order,
+                             `immediate` when it matched on entry
+        inventory            get_inventory snapshot, later fills apply on top
+        orders               live orders confirmed by get_pending_orders
+        checkpoint           the whole state, replay starts from the last one
+    """
+
+    next_request_id: int = 0
+    order_strategy: Dict[OrderID_t, str] = field(default_factory=dict)
+    open_orders: Dict[OrderID_t, JournaledOrder] = field(default_factory=dict)
+    inventory: Dict[InstrumentID_t, List[Quantity_t]] = field(default_factory=dict)  # [reserved, owned]
+    in_doubt: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # rid -> request sent without a response
+    market_time: Optional[Time_t] = None
+    records: int = 0
+
+    def apply(self, record: Dict[str, Any]):
+        self.records += 1
+        event = record.get("event")
+        rid = record.get("rid")
+        market_time = record.get("market_time")
+        if market_time is not None and (self.market_time is None or market_time > self.market_time):
+            self.market_time = market_time
+
+        if event in ("sent", "cancel_sent"):
+            self.next_request_id = max(self.next_request_id, int(rid) + 1)
+            self.in_doubt[rid] = record
+        elif event == "ack":
+            self.in_doubt.pop(rid, None)
+            order_id = record["order_id"]
+            if record.get("strategy"):
+                self.order_strategy[order_id] = record["strategy"]
+            if record.get("resting", 0) > 0:
+                self.open_orders[order_id] = JournaledOrder(
+                    order_id=order_id,
+                    instrument_id=record["instrument_id"],
+                    side=record["side"],
+                    price=record["price"],
+                    quantity=record["resting"],
+                    expiry=record["expiry"],
+                    cancel_at=record.get("cancel_at"),
+                    strategy=record.get("strategy"),
+                )
+        elif event in ("reject", "cancel_reject"):
+            self.in_doubt.pop(rid, None)
+        elif event == "cancel":
+            self.in_doubt.pop(rid, None)
+            self.open_orders.pop(record["order_id"], None)
+        elif event == "fill":
+            order = self.open_orders.get(record.get("order_id"))
+            # Immediate fills were never part of the acked resting quantity
+            if order is not None and not record.get("immediate"):
+                order.quantity -= record["quantity"]
+                if order.quantity <= 0:
+                    del self.open_orders[order.order_id]
+            signed = record["quantity"] if record["side"] == "bid" else -record["quantity"]
+            held = self.inventory.setdefault(record["instrument_id"], [0, 0])
+            held[1] += signed
+        elif event == "inventory":
+            self.inventory = {instr_id: list(held) for instr_id, held in record["data"].items()}
+        elif event == "orders":
+            # The exchange's view supersedes whatever was in flight before it
+            self.in_doubt.clear()
+            live = {}
+            for order_id, instrument_id, side, price, unfilled, expiry in record["orders"]:
+                order = self.open_orders.get(order_id)
+                if order is None:
+                    order = JournaledOrder(order_id, instrument_id, side, price, unfilled, expiry,
+                                           strategy=self.order_strategy.get(order_id))
+                order.quantity = unfilled
+                live[order_id] = order
+            self.open_orders = live
+        elif event == "checkpoint":
+            self.next_request_id = max(self.next_request_id, record["next_request_id"])
+            self.open_orders = {o["order_id"]: JournaledOrder(**o) for o in record["open_orders"]}
+            self.order_strategy = {o.order_id: o.strategy for o in self.open_orders.values() if o.strategy}
+            self.inventory = {instr_id: list(held) for instr_id, held in record["inventory"].items()}
+            self.in_doubt = dict(record["in_doubt"])
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """State as a single record, strategy tags are kept for open orders only"""
+        return {
+            "event": "checkpoint",
+            "next_request_id": self.next_request_id,
+            "market_time": self.market_time,
+            "open_orders": [vars(order) for order in self.open_orders.values()],
+            "inventory": self.inventory,
+            "in_doubt": self.in_doubt,
+        }
+
+    def drop_expired(self):
+        """Forget orders the exchange has expired by the last market time seen"""
+        if self.market_time is None:
+            return
+        for order_id in [o.order_id for o in self.open_orders.values() if o.expiry <= self.market_time]:
+            del self.open_orders[order_id]
+
+
+class Journal:
+    """Append-only JSONL journal of our requests, responses and fills.
+
+    append() only queues the record. A writer thread serializes everything
+    queued since its last write and fsyncs once per batch (group commit), so
+    the event loop never waits on the disk and a burst of orders costs one
+    fsync. flush() blocks until what was appended so far is durable.
+
+    The writer also keeps the replayed state up to date and writes it out
+    every `checkpoint_every` records, so recovery only parses the tail.
+    """
+
+    def __init__(self, path: str, fsync: bool = True, checkpoint_every: int = 10000):
+        self.path = path
+        self.fsync = fsync
+        self.checkpoint_every = checkpoint_every
+        self.batches = 0
+        self.state = JournalState()  # owned by the writer thread once started
+        self._since_checkpoint = 0
+        self._queue: List[Dict[str, Any]] = []
+        self._cond = threading.Condition()
+        self._appended = 0
+        self._durable = 0
+        self._closed = False
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+        self._valid_bytes = 0
+
+    def _last_checkpoint(self, f) -> int:
+        """Offset of the last checkpoint line, 0 when there is none"""
+        end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - _SCAN_BLOCK)
+            f.seek(start)
+            # Overlap the next block so a marker straddling the boundary is found
+            block = f.read(end - start + len(_CHECKPOINT))
+            i = block.rfind(b"\n" + _CHECKPOINT)
+            if i >= 0:
+                return start + i + 1
+            end = start
+        return 0
+
+    def records(self, from_checkpoint: bool = True) -> Iterator[Dict[str, Any]]:
+        """Complete records on disk, a line torn by a crash mid-write ends the journal"""
+        self._valid_bytes = 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            self._valid_bytes = self._last_checkpoint(f) if from_checkpoint else 0
+            f.seek(self._valid_bytes)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                self._valid_bytes += len(line)
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Journal {self.path}: skipping unreadable record")
+
+    def recover(self) -> JournalState:
+        """Replay the journal and drop a torn trailing record so appends stay line aligned"""
+        t0 = time.perf_counter()
+        state = self.state = JournalState()
+        for record in self.records():
+            state.apply(record)
+        state.drop_expired()
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self._valid_bytes:
+            logger.warning(f"Journal {self.path}: truncating torn record after byte {self._valid_bytes}")
+            os.truncate(self.path, self._valid_bytes)
+
+        logger.info(f"Journal {self.path}: replayed {state.records} records in {(time.perf_counter() - t0) * 1000:.0f}ms, "
+                    f"{len(state.open_orders)} open orders, {len(state.in_doubt)} requests without response")
+        return state
+
+    def start(self):
+        """Open for appending and start the writer thread"""
+        if self._thread is not None:
+            return
+        self._closed = False
+        self._file = open(self.path, "ab")
+        self._write([self.state.checkpoint()])
+        self._since_checkpoint = 0
+        self._thread = threading.Thread(target=self._writer, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, record: Dict[str, Any]):
+        """Queue one record, serialized later on the writer thread: pass copies, never live state"""
+        record.setdefault("time", int(time.time() * 1000))
+        with self._cond:
+            self._queue.append(record)
+            self._appended += 1
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every record appended so far is on disk"""
+        with self._cond:
+            target = self._appended
+            return self._cond.wait_for(lambda: self._durable >= target or self._thread is None, timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def _writer(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                batch, self._queue = self._queue, []
+
+            for record in batch:
+                self.state.apply(record)
+            self._since_checkpoint += len(batch)
+            lines = batch
+            if self._since_checkpoint >= self.checkpoint_every:
+                lines = batch + [self.state.checkpoint()]
+                self._since_checkpoint = 0
+
+            try:
+                self._write(lines)
+            except Exception as e:
+                logger.error(f"Journal {self.path}: failed to write {len(batch)} records: {e}")
+
+            with self._cond:
+                self._durable += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+
+    def _write(self, records: List[Dict[str, Any]]):
+        self._file.write("".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records).encode())
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter as _Counter
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any
+
+from metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CallbackStats:
+    owner: str
+    slow_count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_location: Optional[str] = None
+
+
+def describe_owner(callback: Any) -> str:
+    """Name of the task (e.g. the bot) or function behind an event loop callback"""
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"{owner.get_name()}:{getattr(coro, '__qualname__', coro)}"
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def _location(callback: Any) -> Optional[str]:
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        frame = getattr(owner.get_coro(), "cr_frame", None)
+        if frame is not None:
+            return f"{frame.f_code.co_filename}:{frame.f_lineno}"
+    return None
+
+
+class LoopMonitor:
+    """Watchdog for event loop scheduling lag and slow callbacks.
+
+    A probe task measures how late `asyncio.sleep(interval)` wakes up, and
+    every callback run by the loop is timed so slow ones are attributed to
+    the task that ran them. Name bot tasks (`create_task(..., name=...)`)
+    to get per-bot attribution.
+    """
+
+    def __init__(self, interval: float = 0.05, slow_callback_ms: float = 20, metrics: Optional[Metrics] = None):
+        self.interval = interval
+        self.slow_callback_ms = slow_callback_ms
+        self.metrics = metrics or Metrics()
+        self.stats: Dict[str, CallbackStats] = {}
+        self.max_lag_ms = 0.0
+
+        self._m_lag = self.metrics.histogram("loop_lag_us")
+        self._m_slow = self.metrics.counter("slow_callbacks_total")
+        self._probe: Optional[asyncio.Task] = None
+        self._original_run = None
+
+    def start(self):
+        """Install the callback hook and start the lag probe on the running loop"""
+        if self._probe:
+            return
+        self._install_hook()
+        self._probe = asyncio.create_task(self._probe_lag(), name="loop-monitor")
+
+    def stop(self):
+        if self._probe:
+            self._probe.cancel()
+            self._probe = None
+        if self._original_run:
+            asyncio.events.Handle._run = self._original_run
+            self._original_run = None
+
+    def _install_hook(self):
+        original_run = self._original_run = asyncio.events.Handle._run
+        threshold = self.slow_callback_ms / 1000
+        monitor = self
+
+        def _run(handle):
+            start = time.perf_counter()
+            original_run(handle)
+            elapsed = time.perf_counter() - start
+            if elapsed > threshold:
+                monitor._record_slow(handle._callback, elapsed * 1000)
+
+        asyncio.events.Handle._run = _run
+
+    def _record_slow(self, callback: Any, elapsed_ms: float):
+        owner = describe_owner(callback)
+        stats = self.stats.get(owner)
+        if stats is None:
+            stats = self.stats[owner] = CallbackStats(owner=owner)
+        stats.slow_count += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.last_location = _location(callback)
+        self._m_slow.inc()
+        logger.warning(f"Slow callback {owner} blocked the loop for {elapsed_ms:.1f}ms (at {stats.last_location})")
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self._m_lag.record(int(lag_ms * 1000))
+
+    def top_offenders(self, limit: int = 10) -> List[CallbackStats]:
+        """Owners sorted by total time spent in slow callbacks"""
+        return sorted(self.stats.values(), key=lambda s: s.total_ms, reverse=True)[:limit]
+
+    def log_report(self, limit: int = 10):
+        logger.info(f"[loop] max lag {self.max_lag_ms:.1f}ms")
+        for stats in self.top_offenders(limit):
+            logger.info(f"[loop] {stats.owner}: {stats.slow_count} slow callbacks, "
+                        f"{stats.total_ms:.1f}ms total, {stats.max_ms:.1f}ms max")
+
+    async def profile_task(self, task_name: str, duration: float = 10, interval: float = 0.001) -> "SamplingProfiler":
+        """Sample the stacks of a single task (e.g. one bot) for `duration` seconds"""
+        profiler = SamplingProfiler(task_name, asyncio.get_running_loop(), interval)
+        profiler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.stop()
+        return profiler
+
+
+class SamplingProfiler:
+    """Samples the loop thread from a background thread, keeping only the
+    stacks taken while the named task is the one running.
+
+    Python only hands the GIL over every `sys.getswitchinterval()` (5ms by
+    default) while pure Python code runs, which bounds the effective rate.
+    """
+
+    def __init__(self, task_name: str, loop: asyncio.AbstractEventLoop, interval: float = 0.001):
+        self.task_name = task_name
+        self.loop = loop
+        self.interval = interval
+        self.samples: _Counter = _Counter()
+        self.total_samples = 0
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.task_name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        current_tasks = asyncio.tasks._current_tasks
+        while not self._stop.wait(self.interval):
+            self.total_samples += 1
+            task = current_tasks.get(self.loop)
+            if task is None or task.get_name() != self.task_name:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ("frame;frame;frame count"), input for flamegraph.pl / speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def write_collapsed(self, path: str):
+        with open(path, "w") as fh:
+            fh.write(self.collapsed() + "\n")
+        logger.info(f"Wrote {sum(self.samples.values())} samples of {self.task_name} to {path}")
@@ -1,8 +1,10 @@
 import asyncio
 from api import GameAPI
+from journal import Journal
 import logging
 import os 
 from test_bot import TradingBot
+from loop_monitor import LoopMonitor
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -16,19 +18,35 @@ async def main():
     # Create and connect to market data cache
     cache = GameAPI(
         EXCHANGE_URI,
-        TEAM_SECRET # Set to True to see all raw updates in logs
+        TEAM_SECRET, # Set to True to see all raw updates in logs
+        order_connections=2,  # market data on its own socket, orders spread over two more
+        bars=False,  # TradingBot reads the books only, skip numpy for a faster (re)start
+        journal=Journal("journal.jsonl")  # replayed on restart: request ids, open orders, positions
     )
     
 
     await cache.connect()
 
+    # Latency / throughput instrumentation: periodic log snapshot + Prometheus text endpoint
+    asyncio.create_task(cache.metrics.log_periodically(30))
+    try:
+        await cache.metrics.serve(port=9464)
+    except OSError as e:  # port taken (e.g. a second instance), trade without the endpoint
+        logger.error(f"Metrics endpoint disabled, could not listen on port 9464: {e}")
+
+    # Event loop lag watchdog, slow callbacks are attributed to the bot task that ran them
+    monitor = LoopMonitor(metrics=cache.metrics)
+    monitor.start()
+
     testbots = []
     for i in range(10):
         testbots.append(TradingBot(cache))
 
         
-    for bot in testbots:
-        await bot.run()
+    # Still run one after the other, in named tasks so lag / profiles can be attributed per bot
+    # (e.g. `(await monitor.profile_task("TradingBot-0")).write_collapsed("bot0.folded")`)
+    for i, bot in enumerate(testbots):
+        await asyncio.create_task(bot.run(), name=f"TradingBot-{i}")
 
 
     # while True:
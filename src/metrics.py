@@ -0,0 +1,248 @@
+import asyncio
+import logging
+from typing import Optional, List, Dict, Tuple, Any
+
+logger = logging.getLogger(__name__)
+
+# Metrics are only ever touched from the event loop thread, so plain int
+# updates are enough: no locks anywhere on the recording path.
+
+Labels_t = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: int = 1):
+        self.value += n
+
+
+class Gauge:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """HDR-style log-linear histogram over non-negative integers.
+
+    Values below 2**sub_bits are counted exactly, above that every power of
+    two is split in 2**(sub_bits-1) linear buckets, i.e. a relative error
+    below 2**-(sub_bits-1) (< 1.6% with the default 7 bits). Buckets are
+    preallocated so `record` never allocates.
+    """
+
+    __slots__ = ("sub_bits", "max_value", "counts", "count", "total", "min", "max", "_half")
+
+    def __init__(self, sub_bits: int = 7, max_value: int = 1 << 40):
+        self.sub_bits = sub_bits
+        self.max_value = max_value
+        self._half = 1 << (sub_bits - 1)
+        self.counts: List[int] = [0] * (self._index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        exp = value.bit_length() - self.sub_bits
+        if exp <= 0:
+            return value
+        return (1 << self.sub_bits) + (exp - 1) * self._half + ((value >> exp) - self._half)
+
+    def _lower_bound(self, index: int) -> int:
+        size = 1 << self.sub_bits
+        if index < size:
+            return index
+        exp, offset = divmod(index - size, self._half)
+        return (offset + self._half) << (exp + 1)
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        elif value > self.max_value:
+            value = self.max_value
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> int:
+        """Lower bound of the bucket holding the q-th percentile (0-100)"""
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * q / 100 + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(max(self._lower_bound(index), self.min), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "min": self.min or 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "p999": self.percentile(99.9),
+            "max": self.max,
+        }
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+
+class _NullMetric:
+    """Stand-in handed out when instrumentation is disabled"""
+    __slots__ = ()
+    value = 0
+    count = 0
+
+    def inc(self, n: int = 1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def record(self, value: int):
+        pass
+
+
+_NULL = _NullMetric()
+
+
+def _labels(labels: Dict[str, Any]) -> Labels_t:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_name(name: str, labels: Labels_t) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Metrics:
+    """Registry of counters, gauges and histograms with log / Prometheus export"""
+
+    def __init__(self, enabled: bool = True, prefix: str = "algo_trade_"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.counters: Dict[Tuple[str, Labels_t], Counter] = {}
+        self.gauges: Dict[Tuple[str, Labels_t], Gauge] = {}
+        self.histograms: Dict[Tuple[str, Labels_t], Histogram] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    # Handles are meant to be fetched once and kept, lookups are not free
+
+    def counter(self, name: str, **labels) -> Counter:
+        if not self.enabled:
+            return _NULL
+        key = (name, _labels(labels))
+        if key not in self.counters:
+            self.counters[key] = Counter()
+        return self.counters[key]
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        if not self.enabled:
+            return _NULL
+        key = (name, _labels(labels))
+        if key not in self.gauges:
+            self.gauges[key] = Gauge()
+        return self.gauges[key]
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        if not self.enabled:
+            return _NULL
+        key = (name, _labels(labels))
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        return self.histograms[key]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Point-in-time copy of every metric, keyed by formatted name"""
+        snap = {}
+        for (name, labels), metric in self.counters.items():
+            snap[_format_name(name, labels)] = metric.value
+        for (name, labels), metric in self.gauges.items():
+            snap[_format_name(name, labels)] = metric.value
+        for (name, labels), metric in self.histograms.items():
+            snap[_format_name(name, labels)] = metric.snapshot()
+        return snap
+
+    def to_prometheus(self) -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        lines = []
+        for kind, store in (("counter", self.counters), ("gauge", self.gauges)):
+            seen = set()
+            for (name, labels), metric in sorted(store.items()):
+                full = self.prefix + name
+                if full not in seen:
+                    lines.append(f"# TYPE {full} {kind}")
+                    seen.add(full)
+                lines.append(f"{_format_name(full, labels)} {metric.value}")
+
+        seen = set()
+        for (name, labels), hist in sorted(self.histograms.items(), key=lambda item: item[0]):
+            full = self.prefix + name
+            if full not in seen:
+                lines.append(f"# TYPE {full} summary")
+                seen.add(full)
+            for q in (0.5, 0.9, 0.99, 0.999):
+                lines.append(f"{_format_name(full, labels + (('quantile', str(q)),))} {hist.percentile(q * 100)}")
+            lines.append(f"{_format_name(full + '_sum', labels)} {hist.total}")
+            lines.append(f"{_format_name(full + '_count', labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def log_summary(self):
+        for name, value in sorted(self.snapshot().items()):
+            if isinstance(value, dict):
+                if not value["count"]:
+                    continue
+                value = " ".join(f"{k}={v:.0f}" for k, v in value.items())
+            logger.info(f"[metrics] {name} {value}")
+
+    async def log_periodically(self, interval: float = 30):
+        """Log a snapshot every `interval` seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            self.log_summary()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464):
+        """Serve the Prometheus text endpoint on a minimal local HTTP server"""
+
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                await reader.readuntil(b"\r\n\r\n")
+                body = self.to_prometheus().encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/plain; version=0.0.4\r\n"
+                    b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+                    b"Connection: close\r\n\r\n" + body
+                )
+                await writer.drain()
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        self._server = await asyncio.start_server(handle, host, port)
+        logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+        return self._server
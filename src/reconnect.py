@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import random
+import websockets
+from websockets.protocol import State
+from dataclasses import dataclass
+from typing import Optional, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from api import GameAPI, Connection
+
+logger = logging.getLogger(__name__)
+
+# Reads are safe to send twice, order entry is not: an add/cancel that was on
+# the wire when the socket dropped may or may not have reached the exchange.
+IDEMPOTENT_REQUESTS = {"get_inventory", "get_pending_orders"}
+
+
+@dataclass
+class BackoffPolicy:
+    initial: float = 0.01  # seconds, first retry after the immediate attempt
+    factor: float = 2.0
+    max_delay: float = 5.0
+    jitter: float = 0.1  # +/- fraction of each delay
+    max_attempts: Optional[int] = None  # None retries forever
+
+    def delays(self) -> Iterator[float]:
+        """Delay before each attempt, the first attempt is immediate"""
+        yield 0.0
+        delay = self.initial
+        attempt = 1
+        while self.max_attempts is None or attempt < self.max_attempts:
+            yield delay * (1 + random.uniform(-self.jitter, self.jitter))
+            delay = min(delay * self.factor, self.max_delay)
+            attempt += 1
+
+
+class ReconnectError(ConnectionError):
+    """Raised into requests that cannot survive a dropped connection"""
+
+
+class ReconnectManager:
+    """Re-establishes one dropped GameAPI connection.
+
+    On loss: order entry requests in flight on it are failed with
+    ReconnectError, idempotent reads are kept, and market data is flagged
+    stale if the connection carried it. Once a new socket is up the kept
+    reads are replayed in request id order, then inventory and pending
+    orders are resynchronized in a separate task, so a drop during the
+    resync starts a fresh reconnect. A drop reported while the new socket
+    is still being set up makes the reconnect start over.
+    """
+
+    def __init__(self, api: "GameAPI", conn: "Connection", policy: Optional[BackoffPolicy] = None):
+        self.api = api
+        self.conn = conn
+        self.policy = policy or BackoffPolicy()
+        self.reconnects = 0
+        self._task: Optional[asyncio.Task] = None
+        self._m_reconnects = api.metrics.counter("reconnects_total", connection=conn.name)
+        self._m_failed = api.metrics.counter("requests_failed_on_disconnect_total", connection=conn.name)
+        self._m_replayed = api.metrics.counter("requests_replayed_total", connection=conn.name)
+
+    @property
+    def reconnecting(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def connection_lost(self):
+        """Start recovering, no-op if a reconnect is already running (it checks
+        the new socket is still open before finishing)"""
+        if self.reconnecting:
+            return
+        self._task = asyncio.create_task(self._reconnect(), name=f"gameapi-reconnect-{self.conn.name}")
+
+    async def _reconnect(self):
+        api, conn = self.api, self.conn
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        conn.connected.clear()
+        if conn.carries_market_data:
+            api.mark_market_data_stale()
+
+        while True:
+            self._fail_in_flight(lambda request_type: request_type not in IDEMPOTENT_REQUESTS)
+            for attempt, delay in enumerate(self.policy.delays(), 1):
+                if api._closing:
+                    return
+                await asyncio.sleep(delay)
+                try:
+                    await api._open(conn)
+                    break
+                except Exception as e:
+                    logger.warning(f"Reconnect attempt {attempt} failed: {e}")
+            else:
+                logger.error("Giving up reconnecting to the exchange")
+                self._fail_in_flight(lambda request_type: True)
+                return
+
+            self.reconnects += 1
+            self._m_reconnects.inc()
+            api._start_receiving(conn)
+            try:
+                await self._replay_in_flight()
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            # Its receive loop may already have reported the drop, to us
+            if conn.ws.state is State.OPEN:
+                break
+            logger.warning(f"GameAPI {conn.name} dropped again while reconnecting")
+
+        conn.connected.set()
+        logger.info(f"GameAPI {conn.name} reconnected in {(loop.time() - started) * 1000:.0f}ms after {attempt} attempt(s)")
+
+        # Own task: this reconnect is done, a drop during the resync starts the next one
+        if conn.carries_orders:
+            asyncio.create_task(self._resync(), name=f"gameapi-resync-{conn.name}")
+
+    async def _resync(self):
+        try:
+            await self.api.resync()
+        except Exception as e:
+            logger.error(f"State resync after reconnect failed: {e}")
+
+    def _fail_in_flight(self, should_fail):
+        api, in_flight = self.api, self.conn.in_flight
+        for rid in sorted(in_flight):
+            request_type, _ = in_flight[rid]
+            if not should_fail(request_type):
+                continue
+            del in_flight[rid]
+            fut = api._pending.pop(rid, None)
+            if fut is not None and not fut.done():
+                fut.set_exception(ReconnectError(f"Connection lost before response to {request_type} {rid}"))
+                self._m_failed.inc()
+
+    async def _replay_in_flight(self):
+        conn = self.conn
+        for rid in sorted(conn.in_flight):
+            request_type, encoded = conn.in_flight[rid]
+            logger.debug(f"Replaying request {rid} on {conn.name}: {request_type}")
+            await conn.ws.send(encoded)
+            self._m_replayed.inc()
@@ -1,16 +1,440 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Tuple, Iterator, Sequence, TYPE_CHECKING
+
 import numpy as np
-import pandas as pd
-from api import GameAPI
+from api import GameAPI, AddOrderResponse, InstrumentID_t, OrderID_t
+from instruments import InstrumentRegistry, KIND_FUTURE, KIND_CALL, KIND_PUT
+
+# pandas is only needed to replay recorded books, live runners never load it
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SIDES = ("bid", "ask")
+
+
+@dataclass
+class MarketView:
+    """Batched snapshot of every instrument, row i is `instruments[i]`.
+
+    Book arrays are (instruments, depth), best level first, NaN where the
+    book is thinner than `depth` or the instrument has no book. Live views
+    are indexed by InstrumentRegistry id, like bars and the QuoteBook.
+    `time` is the exchange clock in ms (GameAPI.last_market_time).
+    """
+    time: int
+    instruments: List[InstrumentID_t]
+    bid_price: np.ndarray
+    bid_qty: np.ndarray
+    ask_price: np.ndarray
+    ask_qty: np.ndarray
+    position: np.ndarray
+    features: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def best_bid(self) -> np.ndarray:
+        return self.bid_price[:, 0]
+
+    @property
+    def best_ask(self) -> np.ndarray:
+        return self.ask_price[:, 0]
 
+    @property
+    def mid(self) -> np.ndarray:
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> np.ndarray:
+        return self.best_ask - self.best_bid
+
+
+@dataclass
+class Quotes:
+    """Target resting orders, one bid and one ask per instrument row.
+
+    A NaN price or a zero quantity means no order on that side.
+    """
+    bid_price: np.ndarray
+    bid_qty: np.ndarray
+    ask_price: np.ndarray
+    ask_qty: np.ndarray
+
+    @classmethod
+    def empty(cls, n: int) -> "Quotes":
+        return cls(np.full(n, np.nan), np.zeros(n), np.full(n, np.nan), np.zeros(n))
 
 
 class Strategy:
+    """Base class: map a MarketView to target Quotes, the runner does the rest.
 
-    def __init__(self, data: pd.DataFrame):
+    Implementations should stick to array operations over the whole view;
+    the same code runs live (StrategyRunner.run_live) and on recorded books
+    (StrategyRunner.run_replay).
+    """
+
+    def __init__(self, data: Optional["pd.DataFrame"] = None):
         self.data = data
 
+    def detect_opportunities(self, view: MarketView) -> Optional[Quotes]:
+        """Return the quotes to have on the book, or None to leave orders untouched"""
+        return None
+
+
+class ImbalanceStrategy(Strategy):
+    """Vectorized version of TradingBot's rule: join the best bid when the
+    volume-weighted fair price is above the mid, the best ask otherwise."""
+
+    def __init__(self, quantity: int = 1, max_position: int = 10, data: Optional["pd.DataFrame"] = None):
+        super().__init__(data)
+        self.quantity = quantity
+        self.max_position = max_position
+
+    def detect_opportunities(self, view: MarketView) -> Optional[Quotes]:
+        bid, ask = view.best_bid, view.best_ask
+        bid_qty, ask_qty = view.bid_qty[:, 0], view.ask_qty[:, 0]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fair = (ask * ask_qty + bid * bid_qty) / (bid_qty + ask_qty)
+        mid = view.mid
+        tradeable = np.isfinite(fair) & np.isfinite(mid)
+        kind = view.features.get("instrument_kind")
+        if kind is not None:
+            # Futures and options only, like TradingBot: underlyings have no expiry to order with
+            tradeable &= np.isin(kind, (KIND_FUTURE, KIND_CALL, KIND_PUT))
+
+        quotes = Quotes.empty(len(view.instruments))
+        buy = tradeable & (mid < fair) & (view.position < self.max_position)
+        sell = tradeable & (mid >= fair) & (view.position > -self.max_position)
+        quotes.bid_price[buy] = bid[buy]
+        quotes.bid_qty[buy] = self.quantity
+        quotes.ask_price[sell] = ask[sell]
+        quotes.ask_qty[sell] = self.quantity
+        return quotes
+
+
+# ========== Views ==========
+
+def _require_book_depth(api: GameAPI, depth: int):
+    if depth < 1 or depth > api.book_depth:
+        raise ValueError(f"A view of depth {depth} needs GameAPI(..., book_depth>={max(depth, 1)}), "
+                         f"this one keeps {api.book_depth} levels")
+
+
+def _level_block(api: GameAPI, name: str, n: int, depth: int) -> np.ndarray:
+    block = np.full((n, depth), np.nan)
+    if not api.book_depth:
+        return block
+    rows = min(n, len(api.book_levels[name]) // api.book_depth)
+    levels = np.array(api.book_levels[name][:rows * api.book_depth], dtype=np.float64)
+    block[:rows] = levels.reshape(rows, api.book_depth)[:, :depth]
+    return block
+
+
+def view_from_api(api: GameAPI, depth: int = 5, bar_resolution_ms: Optional[int] = 1000) -> MarketView:
+    """Snapshot the GameAPI caches into a MarketView, row i is instrument id i.
+
+    Needs GameAPI(..., book_depth=depth) or deeper.
+    """
+    _require_book_depth(api, depth)
+    registry = api.instruments
+    n = len(registry)
+    bid_price, bid_qty, ask_price, ask_qty = (
+        _level_block(api, name, n, depth) for name in ("bid_price", "bid_qty", "ask_price", "ask_qty"))
+    position = np.zeros(n)
+
+    for instr_id, held in api.inventory.items():
+        i = registry.ids.get(instr_id)
+        if i is not None and i < n and held:
+            position[i] = held[1]  # (reserved, owned)
+
+    features = {f"instrument_{name}": column[:n] for name, column in registry.columns().items()}
+    if bar_resolution_ms is not None and api.bars is not None and bar_resolution_ms in api.bars.series:
+        for name, values in api.bars.latest(bar_resolution_ms).items():
+            features[f"bar_{name}"] = values[:n].copy()
+
+    instruments = registry.names[:n]
+    return MarketView(api.last_market_time or 0, instruments, bid_price, bid_qty, ask_price, ask_qty, position, features)
+
+
+class ReplaySource:
+    """MarketViews rebuilt from an N-level book table (see logs/log_converter.py).
+
+    Recorded `time` is the raw exchange clock, scaled to ms by
+    `exchange_time_ms` like GameAPI does live.
+    """
+
+    def __init__(self, book: "pd.DataFrame", depth: int = 5, exchange_time_ms: int = 1000):
+        self.depth = depth
+        self.exchange_time_ms = exchange_time_ms
+        self.book = book.sort_values(["time", "asset"], kind="stable").reset_index(drop=True)
+        # Underlyings get interned too, as rows without a book
+        self.registry = InstrumentRegistry()
+        for instr_id in sorted(self.book["asset"].unique()):
+            self.registry.intern(instr_id)
+        self.instruments: List[InstrumentID_t] = list(self.registry.names)
+
+    @classmethod
+    def from_parquet(cls, path: str, depth: int = 5, exchange_time_ms: int = 1000) -> "ReplaySource":
+        import pandas as pd
+        return cls(pd.read_parquet(path), depth, exchange_time_ms)
+
+    def _column_block(self, prefix: str) -> np.ndarray:
+        columns = [f"{prefix}{level}" for level in range(1, self.depth + 1)]
+        return self.book[columns].astype("float64").to_numpy(na_value=np.nan)
+
+    def __iter__(self) -> Iterator[MarketView]:
+        import pandas as pd
+        n = len(self.instruments)
+        rows = pd.Categorical(self.book["asset"], categories=self.instruments).codes
+        times = self.book["time"].to_numpy()
+        blocks = {name: self._column_block(name) for name in ("bid_price", "bid_quantity", "ask_price", "ask_quantity")}
+        boundaries = np.flatnonzero(np.diff(times)) + 1
+
+        features = {f"instrument_{name}": column for name, column in self.registry.columns().items()}
+
+        # Books carry forward between snapshots, like current_orderbooks does live
+        state = {name: np.full((n, self.depth), np.nan) for name in blocks}
+        for chunk in np.split(np.arange(len(times)), boundaries):
+            if not len(chunk):
+                continue
+            for name, block in blocks.items():
+                state[name][rows[chunk]] = block[chunk]
+            yield MarketView(
+                time=int(times[chunk[0]] * self.exchange_time_ms),
+                instruments=self.instruments,
+                bid_price=state["bid_price"].copy(),
+                bid_qty=state["bid_quantity"].copy(),
+                ask_price=state["ask_price"].copy(),
+                ask_qty=state["ask_quantity"].copy(),
+                position=np.zeros(n),
+                features=dict(features),
+            )
+
+
+# ========== Order diffing ==========
+
+@dataclass
+class OrderAction:
+    instrument_id: InstrumentID_t
+    side: str
+    price: int = 0
+    quantity: int = 0
+    order_id: Optional[OrderID_t] = None
+    row: int = 0  # row in the QuoteBook
+
+
+class QuoteBook:
+    """Our live quotes, one slot per (instrument, side), stored as arrays so
+    the diff against a strategy's targets is a handful of vector ops."""
+
+    def __init__(self, capacity: int = 256, registry: Optional[InstrumentRegistry] = None):
+        self.registry = registry if registry is not None else InstrumentRegistry()
+        self.index: Dict[InstrumentID_t, int] = self.registry.ids
+        self.instruments: List[InstrumentID_t] = self.registry.names
+        self.price = np.full((capacity, 2), np.nan)
+        self.qty = np.zeros((capacity, 2))
+        self.order_ids = np.full((capacity, 2), None, dtype=object)
+
+    def rows(self, instruments: Sequence[InstrumentID_t]) -> np.ndarray:
+        intern = self.registry.intern
+        rows = np.fromiter((intern(i) for i in instruments), dtype=np.intp, count=len(instruments))
+        if len(self.instruments) > len(self.price):
+            extra = max(len(self.instruments), 2 * len(self.price)) - len(self.price)
+            self.price = np.vstack([self.price, np.full((extra, 2), np.nan)])
+            self.qty = np.vstack([self.qty, np.zeros((extra, 2))])
+            self.order_ids = np.vstack([self.order_ids, np.full((extra, 2), None, dtype=object)])
+        return rows
+
+    def forget(self, live_order_ids: set):
+        """Drop quotes whose order is no longer live (filled, expired, cancelled)"""
+        rows, sides = np.nonzero(self.order_ids != None)  # noqa: E711 - elementwise on object array
+        for row, side in zip(rows, sides):
+            if self.order_ids[row, side] not in live_order_ids:
+                self.price[row, side] = np.nan
+                self.qty[row, side] = 0
+                self.order_ids[row, side] = None
+
+    def diff(self, instruments: Sequence[InstrumentID_t], quotes: Quotes) -> Tuple[List[OrderAction], List[OrderAction]]:
+        """Cancels and adds needed to move the live quotes to `quotes`"""
+        rows = self.rows(instruments)
+        target_price = np.column_stack([quotes.bid_price, quotes.ask_price])
+        target_qty = np.column_stack([quotes.bid_qty, quotes.ask_qty])
+        wanted = np.isfinite(target_price) & (target_qty > 0)
+        target_price = np.where(wanted, target_price, np.nan)
+        target_qty = np.where(wanted, target_qty, 0)
+
+        live_price = self.price[rows]
+        live_qty = self.qty[rows]
+        live = np.isfinite(live_price)
+        same = (live == wanted) & (~wanted | ((live_price == target_price) & (live_qty == target_qty)))
+        changed = ~same
+
+        cancels = []
+        for i, side in zip(*np.nonzero(changed & live)):
+            row = rows[i]
+            cancels.append(OrderAction(instruments[i], SIDES[side], order_id=self.order_ids[row, side], row=row))
+        adds = []
+        for i, side in zip(*np.nonzero(changed & wanted)):
+            adds.append(OrderAction(instruments[i], SIDES[side], int(target_price[i, side]), int(target_qty[i, side]), row=rows[i]))
+        return cancels, adds
+
+    def cancelled(self, action: OrderAction):
+        side = SIDES.index(action.side)
+        self.price[action.row, side] = np.nan
+        self.qty[action.row, side] = 0
+        self.order_ids[action.row, side] = None
+
+    def placed(self, action: OrderAction, order_id: OrderID_t):
+        side = SIDES.index(action.side)
+        self.price[action.row, side] = action.price
+        self.qty[action.row, side] = action.quantity
+        self.order_ids[action.row, side] = order_id
+
+
+# ========== Execution ==========
+
+class LiveExecution:
+    """Sends the diff to the exchange through GameAPI"""
+
+    def __init__(self, api: GameAPI, time_in_force_ms: Optional[int] = None, strategy: Optional[str] = None):
+        self.api = api
+        self.time_in_force_ms = time_in_force_ms
+        self.strategy = strategy  # tag recorded in the journal for every order placed
+        self.registry = api.instruments
+
+    def live_order_ids(self) -> set:
+        return set(self.api.order_expiry.orders)
+
+    async def cancel(self, actions: List[OrderAction]) -> List[bool]:
+        results = await asyncio.gather(
+            *(self.api.cancel_order(a.instrument_id, a.order_id) for a in actions), return_exceptions=True)
+        ok = [not isinstance(r, Exception) and getattr(r, "success", False) for r in results]
+        if any(not done and not isinstance(r, Exception) for done, r in zip(ok, results)):
+            # Rejected, most likely filled in full: trade events don't say whose order
+            # traded, so ask the exchange and treat orders it no longer has as gone
+            try:
+                await self.api.resync()
+            except Exception as e:
+                logger.warning(f"Resync after rejected cancels failed: {e}")
+                return ok
+            live = self.api.order_expiry.orders
+            ok = [done or a.order_id not in live for done, a in zip(ok, actions)]
+        return ok
+
+    async def add(self, actions: List[OrderAction]) -> List[Optional[OrderID_t]]:
+        results = await asyncio.gather(
+            *(self.api.add_order(a.instrument_id, a.side, a.price, a.quantity,
+                                 time_in_force_ms=self.time_in_force_ms, strategy=self.strategy)
+              for a in actions), return_exceptions=True)
+        order_ids = []
+        for action, result in zip(actions, results):
+            if isinstance(result, AddOrderResponse) and result.success:
+                order_ids.append(result.data.order_id)
+            else:
+                logger.info(f"Order on {action.instrument_id} rejected: {result}")
+                order_ids.append(None)
+        return order_ids
+
+
+class ReplayExecution:
+    """Simulated exchange for replays: resting quotes fill in full as soon
+    as the opposite best price crosses them."""
+
+    def __init__(self):
+        self.orders: Dict[OrderID_t, OrderAction] = {}
+        self.positions: Dict[InstrumentID_t, int] = {}
+        self.cash = 0
+        self.fills: List[Tuple[int, InstrumentID_t, str, int, int]] = []  # (time, instrument, side, price, qty)
+        self._next_id = 0
+
+    def live_order_ids(self) -> set:
+        return set(self.orders)
+
+    def on_view(self, view: MarketView):
+        if not self.orders:
+            return
+        row = {instr_id: i for i, instr_id in enumerate(view.instruments)}
+        for order_id, order in list(self.orders.items()):
+            i = row.get(order.instrument_id)
+            if i is None:
+                continue
+            if order.side == "bid" and view.best_ask[i] <= order.price:
+                sign = 1
+            elif order.side == "ask" and view.best_bid[i] >= order.price:
+                sign = -1
+            else:
+                continue
+            del self.orders[order_id]
+            self.positions[order.instrument_id] = self.positions.get(order.instrument_id, 0) + sign * order.quantity
+            self.cash -= sign * order.quantity * order.price
+            self.fills.append((view.time, order.instrument_id, order.side, order.price, order.quantity))
+        view.position[:] = [self.positions.get(i, 0) for i in view.instruments]
+
+    async def cancel(self, actions: List[OrderAction]) -> List[bool]:
+        return [self.orders.pop(a.order_id, None) is not None for a in actions]
+
+    async def add(self, actions: List[OrderAction]) -> List[Optional[OrderID_t]]:
+        order_ids = []
+        for action in actions:
+            order_id = f"replay-{self._next_id}"
+            self._next_id += 1
+            self.orders[order_id] = action
+            order_ids.append(order_id)
+        return order_ids
+
+
+# ========== Runner ==========
+
+class StrategyRunner:
+    """Feeds MarketViews to a Strategy and applies the resulting order diff"""
+
+    def __init__(self, strategy: Strategy, execution, depth: int = 5):
+        self.strategy = strategy
+        self.execution = execution
+        self.depth = depth
+        # Share the live registry so QuoteBook rows are the instrument ids of the views
+        self.quote_book = QuoteBook(registry=getattr(execution, "registry", None))
+        self.ticks = 0
+
+    async def step(self, view: MarketView):
+        self.ticks += 1
+        quotes = self.strategy.detect_opportunities(view)
+        if quotes is None:
+            return
 
+        self.quote_book.forget(self.execution.live_order_ids())
+        cancels, adds = self.quote_book.diff(view.instruments, quotes)
+        if cancels:
+            stuck = set()
+            for action, ok in zip(cancels, await self.execution.cancel(cancels)):
+                if ok:
+                    self.quote_book.cancelled(action)
+                else:
+                    stuck.add((action.row, action.side))
+            # Don't stack a new quote on top of one we failed to pull
+            adds = [a for a in adds if (a.row, a.side) not in stuck]
+        if adds:
+            for action, order_id in zip(adds, await self.execution.add(adds)):
+                if order_id is not None:
+                    self.quote_book.placed(action, order_id)
 
+    async def run_live(self, api: GameAPI):
+        """Run on every market data update, needs GameAPI(..., book_depth=self.depth)"""
+        _require_book_depth(api, self.depth)
+        updates = api.subscribe_market_data()
+        while True:
+            await updates.get()
+            if api.market_data_stale:
+                continue
+            try:
+                await self.step(view_from_api(api, self.depth))
+            except Exception as e:
+                logger.error(f"Error in strategy step: {e}")
 
-    def detect_opportunities(self):
-        pass
+    async def run_replay(self, source: ReplaySource) -> ReplayExecution:
+        for view in source:
+            self.execution.on_view(view)
+            await self.step(view)
+        return self.execution
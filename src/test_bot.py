@@ -47,38 +47,10 @@ class TradingBot():
         return best_bid, best_ask
 
     def parse_instrument_id(self):
-        """Parse instrument ID to extract type and parameters"""
+        """Type and parameters of the current instrument, parsed once by the API's registry"""
         if not self.instrument_id:
             return None
-        
-        parts = self.instrument_id.split("_")
-        if len(parts) < 3:
-            return None
-        
-        underlying = parts[0]
-        instrument_type = parts[1]
-        
-        if instrument_type == "future":
-            # Format: underlying_future_expiry
-            expiry_seconds = int(parts[2])
-            return {
-                "type": "future",
-                "underlying": underlying,
-                "expiry_seconds": expiry_seconds
-            }
-        elif instrument_type in ["call", "put"]:
-            # Format: underlying_call/put_strike_expiry
-            if len(parts) >= 4:
-                strike = int(parts[2])
-                expiry_seconds = int(parts[3])
-                return {
-                    "type": instrument_type,
-                    "underlying": underlying,
-                    "strike": strike,
-                    "expiry_seconds": expiry_seconds
-                }
-        
-        return None
+        return self.api.instruments.describe(self.instrument_id)
 
     async def place_buy_order(self, price):
         """Place a buy order using the appropriate API method"""
@@ -177,6 +149,10 @@ class TradingBot():
 
         while True:
             try:
+                # Don't trade on books left over from before a disconnect
+                if self.api.market_data_stale:
+                    await self.api.market_data_fresh.wait()
+
                 # Get random instrument if not selected
                 if not self.instrument_id:
                     self.get_random_instrument()
@@ -185,6 +161,7 @@ class TradingBot():
                         continue
                 
                 # Get best bid and ask prices
+                self.orderbook = self.api.current_orderbooks.get(self.instrument_id, self.orderbook)
                 best_bid, best_ask = self.get_best_prices()
 
                 self.compute_fair_mid_price()
@@ -0,0 +1,249 @@
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Callable, Hashable
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Mirrors the aliases in api.py (which imports this module)
+InstrumentID_t = str
+Price_t = int
+Time_t = int
+Quantity_t = int
+OrderID_t = str
+
+
+@dataclass
+class WheelTimer:
+    key: Hashable
+    deadline: Time_t
+    payload: Any = None
+    # Slot dict currently holding the timer, used for O(1) removal
+    _slot: Optional[dict] = field(default=None, repr=False, compare=False)
+    _level: int = field(default=-1, repr=False, compare=False)  # -1 for ready / overflow
+
+
+class TimingWheel:
+    """Hierarchical hashed timing wheel.
+
+    Level 0 slots are `tick_ms` wide, every following level is `wheel_size`
+    times coarser. Timers are cascaded down one level when the wheel reaches
+    their block, so insert, cancel and per-tick expiry are all O(1). Runs of
+    empty levels are skipped a whole block at a time, so advancing a wheel
+    anchored far in the past doesn't walk every tick in between.
+    """
+
+    def __init__(self, tick_ms: int = 10, wheel_size: int = 64, levels: int = 4, start_time: Time_t = 0):
+        if wheel_size & (wheel_size - 1):
+            raise ValueError("wheel_size must be a power of two")
+        self.tick_ms = tick_ms
+        self.levels = levels
+        self._bits = wheel_size.bit_length() - 1
+        self._mask = wheel_size - 1
+        self._wheels: List[List[dict]] = [[{} for _ in range(wheel_size)] for _ in range(levels)]
+        self._overflow: Dict[Hashable, WheelTimer] = {}  # beyond the top level range
+        self._ready: Dict[Hashable, WheelTimer] = {}  # already due, fired on next advance
+        self._timers: Dict[Hashable, WheelTimer] = {}
+        self._counts = [0] * levels  # timers held per level
+        self._current = start_time // tick_ms
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable):
+        return key in self._timers
+
+    def get(self, key: Hashable) -> Optional[WheelTimer]:
+        return self._timers.get(key)
+
+    def reset(self, now: Time_t):
+        """Re-anchor an empty wheel at `now` so the first advance doesn't walk from 0"""
+        if self._timers:
+            raise RuntimeError("cannot reset a wheel with pending timers")
+        self._current = now // self.tick_ms
+
+    def schedule(self, key: Hashable, deadline: Time_t, payload: Any = None) -> WheelTimer:
+        """Schedule (or reschedule) `key` to fire once time reaches `deadline`"""
+        self.cancel(key)
+        timer = WheelTimer(key=key, deadline=deadline, payload=payload)
+        self._timers[key] = timer
+        self._place(timer)
+        return timer
+
+    def cancel(self, key: Hashable) -> Optional[WheelTimer]:
+        """Remove a timer, returns it if it was still pending"""
+        timer = self._timers.pop(key, None)
+        if timer is not None and timer._slot is not None:
+            del timer._slot[key]
+            timer._slot = None
+            if timer._level >= 0:
+                self._counts[timer._level] -= 1
+        return timer
+
+    def advance(self, now: Time_t) -> List[WheelTimer]:
+        """Move the wheel forward to `now` and return every timer that fired"""
+        target = now // self.tick_ms
+        fired = list(self._ready.values())
+        self._ready.clear()
+
+        # Nothing pending: jump straight to the target tick
+        if not self._timers or target <= self._current:
+            if target > self._current:
+                self._current = target
+            return self._release(fired)
+
+        counts = self._counts
+        while self._current < target:
+            # Lowest level holding timers: nothing can fire before its next block
+            level = 0
+            while level < self.levels and not counts[level]:
+                level += 1
+            if level == 0:
+                self._current += 1
+                self._cascade()
+            elif level == self.levels:
+                if not self._overflow:
+                    # Everything left has fired, skip the empty ticks
+                    self._current = target
+                    break
+                # Only timers beyond the top level: go straight to the first one and re-place them
+                first = min(timer.deadline for timer in self._overflow.values()) // self.tick_ms
+                self._current = max(self._current + 1, min(target, first))
+                self._replace(self._overflow)
+            else:
+                block = 1 << (self._bits * level)
+                step_to = (self._current // block + 1) * block
+                if step_to > target:
+                    self._current = target
+                    break
+                self._current = step_to
+                self._cascade()
+
+            slot = self._wheels[0][self._current & self._mask]
+            if slot:
+                counts[0] -= len(slot)
+                fired.extend(slot.values())
+                slot.clear()
+            if self._ready:
+                # Timers due exactly on a block boundary land in _ready when cascaded
+                fired.extend(self._ready.values())
+                self._ready.clear()
+
+        return self._release(fired)
+
+    def _release(self, fired: List[WheelTimer]) -> List[WheelTimer]:
+        for timer in fired:
+            timer._slot = None
+            self._timers.pop(timer.key, None)
+        return fired
+
+    def _place(self, timer: WheelTimer):
+        ticks = timer.deadline // self.tick_ms
+        delta = ticks - self._current
+        timer._level = -1
+        if delta <= 0:
+            slot = self._ready
+        else:
+            for level in range(self.levels):
+                if delta < 1 << (self._bits * (level + 1)):
+                    slot = self._wheels[level][(ticks >> (self._bits * level)) & self._mask]
+                    timer._level = level
+                    self._counts[level] += 1
+                    break
+            else:
+                slot = self._overflow
+        slot[timer.key] = timer
+        timer._slot = slot
+
+    def _cascade(self):
+        """Redistribute coarser slots whose block starts at the current tick"""
+        # Find the highest level whose block boundary we just crossed
+        top = 0
+        while top + 1 < self.levels and not (self._current >> (self._bits * top)) & self._mask:
+            top += 1
+        if top + 1 == self.levels:
+            self._replace(self._overflow)
+        for level in range(top, 0, -1):
+            self._replace(self._wheels[level][(self._current >> (self._bits * level)) & self._mask])
+
+    def _replace(self, slot: dict):
+        if not slot:
+            return
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            if timer._level >= 0:
+                self._counts[timer._level] -= 1
+            self._place(timer)
+
+
+@dataclass
+class TrackedOrder:
+    order_id: OrderID_t
+    instrument_id: InstrumentID_t
+    side: str
+    price: Price_t
+    quantity: Quantity_t
+    expiry: Time_t
+    cancel_at: Optional[Time_t] = None  # local time-in-force deadline
+    reason: str = "expired"  # "expired" or "auto_cancel" once fired
+
+
+class OrderExpiryTracker:
+    """Tracks resting orders and fires expiry / time-in-force callbacks in batches"""
+
+    def __init__(self, tick_ms: int = 10, wheel_size: int = 64, levels: int = 4):
+        self.wheel = TimingWheel(tick_ms=tick_ms, wheel_size=wheel_size, levels=levels)
+        self.orders: Dict[OrderID_t, TrackedOrder] = {}
+        # Callbacks receive the whole batch fired by a single advance()
+        self.on_expired: Optional[Callable[[List[TrackedOrder]], Any]] = None
+        self.on_auto_cancel: Optional[Callable[[List[TrackedOrder]], Any]] = None
+
+    def __len__(self):
+        return len(self.orders)
+
+    def track(self, order_id: OrderID_t, instrument_id: InstrumentID_t, side: str, price: Price_t,
+              quantity: Quantity_t, expiry: Time_t, now: Optional[Time_t] = None,
+              time_in_force_ms: Optional[int] = None) -> TrackedOrder:
+        """Start tracking a resting order until its expiry or time-in-force deadline"""
+        order = TrackedOrder(
+            order_id=order_id,
+            instrument_id=instrument_id,
+            side=side,
+            price=price,
+            quantity=quantity,
+            expiry=expiry,
+        )
+        if now is not None and not self.wheel:
+            self.wheel.reset(now)
+        deadline = expiry
+        if time_in_force_ms is not None and now is not None and now + time_in_force_ms < expiry:
+            order.cancel_at = now + time_in_force_ms
+            order.reason = "auto_cancel"
+            deadline = order.cancel_at
+        self.orders[order_id] = order
+        self.wheel.schedule(order_id, deadline, order)
+        return order
+
+    def untrack(self, order_id: OrderID_t) -> Optional[TrackedOrder]:
+        """Stop tracking an order (cancelled, filled or confirmed gone)"""
+        self.wheel.cancel(order_id)
+        return self.orders.pop(order_id, None)
+
+    def advance(self, now: Time_t) -> List[TrackedOrder]:
+        """Advance to `now`, dispatching expired and auto-cancel batches"""
+        fired = self.wheel.advance(now)
+        if not fired:
+            return []
+
+        expired, auto_cancel = [], []
+        for timer in fired:
+            order = self.orders.pop(timer.key, None)
+            if order is None:
+                continue
+            (auto_cancel if order.reason == "auto_cancel" else expired).append(order)
+
+        if expired and self.on_expired:
+            self.on_expired(expired)
+        if auto_cancel and self.on_auto_cancel:
+            self.on_auto_cancel(auto_cancel)
+        return expired + auto_cancel
@@ -0,0 +1,92 @@
+"""
+Reconnect against a local fake exchange.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from api import GameAPI, AddOrderResponse
+from reconnect import BackoffPolicy
+
+
+class FakeExchange:
+    """Answers every request and streams market data; `drop_on` lists, per
+    connection, the request type that makes it close the socket instead"""
+
+    def __init__(self, drop_on):
+        self.drop_on = list(drop_on)
+        self.connections = 0
+        self.order_id = 0
+
+    async def handler(self, ws):
+        drop_on = self.drop_on[self.connections] if self.connections < len(self.drop_on) else None
+        self.connections += 1
+        await ws.send(json.dumps({"type": "welcome", "message": "hi"}))
+        feed = asyncio.create_task(self._market_data(ws))
+        try:
+            async for msg in ws:
+                request = json.loads(msg)
+                if request["type"] == drop_on:
+                    await ws.close()
+                    return
+                await ws.send(json.dumps(self._respond(request)))
+        finally:
+            feed.cancel()
+
+    async def _market_data(self, ws):
+        book = {"bids": {"999": 5}, "asks": {"1001": 5}}
+        while True:
+            await ws.send(json.dumps({
+                "type": "market_data_update", "time": 1000, "events": [],
+                "candles": {"tradeable": {}, "untradeable": {}},
+                "orderbook_depths": {"$JUMP_future_300": book},
+            }))
+            await asyncio.sleep(0.02)
+
+    def _respond(self, request):
+        rid = request["user_request_id"]
+        if request["type"] == "add_order":
+            self.order_id += 1
+            return {"type": "add_order_response", "user_request_id": rid, "success": True,
+                    "data": {"order_id": str(self.order_id)}}
+        if request["type"] == "get_inventory":
+            return {"type": "get_inventory_response", "user_request_id": rid, "data": {}}
+        return {"type": "get_pending_orders_response", "user_request_id": rid, "data": {}}
+
+
+async def _drop_during_resync():
+    # 1st connection drops on the bot's order, the 2nd during the post-reconnect resync
+    exchange = FakeExchange(drop_on=["add_order", "get_pending_orders"])
+    async with websockets.serve(exchange.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        api = GameAPI(f"ws://127.0.0.1:{port}/trade", "secret", bars=False,
+                      backoff=BackoffPolicy(initial=0.01, max_delay=0.05))
+        await api.connect()
+        try:
+            await asyncio.wait_for(api.market_data_fresh.wait(), 2)
+            try:
+                await api.buy_future("$JUMP", 300, 999)
+            except Exception:
+                pass  # lost with the connection, ReconnectError
+
+            # Recovers on the 3rd connection: fresh market data and orders go through
+            await asyncio.sleep(0.5)
+            await asyncio.wait_for(api.market_data_fresh.wait(), 2)
+            resp = await api.buy_future("$JUMP", 300, 999)
+            assert isinstance(resp, AddOrderResponse) and resp.success
+            assert exchange.connections == 3
+            assert api.connections[0].reconnect.reconnects == 2
+        finally:
+            await api.disconnect()
+
+
+def test_drop_during_resync_reconnects_again():
+    asyncio.run(_drop_during_resync())